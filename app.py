@@ -1,17 +1,21 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import Flask, render_template, request, redirect, url_for, flash, Response
 import os
 from werkzeug.utils import secure_filename
-import example
-import refine
+import dbintegration
+import export
+import jobs
+import pipeline
+import workqueue
 from flask import jsonify
 from bson import ObjectId, json_util
 import json
+import uuid
 from collections import Counter
-from pymongo import MongoClient
-client = MongoClient("mongodb://localhost:27017/")
+from concurrent.futures import ThreadPoolExecutor
 
-# Access (or create) your database
-db = client['document_verification']
+# The OCR stack, the Gemini SDK and the MongoDB client are all created lazily
+# (see pipeline.ocr / pipeline.refiner / dbintegration.get_db), so importing
+# this module stays cheap. Use warm_up() to pay for them before serving.
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'files'  # set your folder name here
@@ -20,39 +24,109 @@ app.secret_key = 'your_secret_key'  # Needed for flashing messages
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg'}
 
+# Page size bounds for the documents listing
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Where /api/jobs runs uploads: 'local' (in-process worker threads) or
+# 'mongo' (durable work queue served by worker.py processes)
+JOB_BACKEND = os.environ.get('VERITO_JOB_BACKEND', 'local')
+
 bs = None
 cs = None
 
+_job_queue = None
+
+# Keep a copy of every original upload in UPLOAD_FOLDER (written asynchronously)
+PERSIST_UPLOADS = os.environ.get('VERITO_PERSIST_UPLOADS', '1') == '1'
+_persist_pool = None
+
+def warm_up(ocr_stack=True):
+    """
+    Pre-initialize heavy modules and clients in a pre-forked worker, e.g. from
+    gunicorn's post_fork hook:
+
+        def post_fork(server, worker):
+            import app
+            app.warm_up()
+
+    Pass ocr_stack=False for web-only workers that never process uploads
+    (VERITO_JOB_BACKEND=mongo); they then boot without OpenCV/Tesseract.
+    Otherwise the local job workers are started as well, each warming its own
+    Tesseract instances.
+    """
+    pipeline.warm_up(ocr_stack=ocr_stack)
+    if ocr_stack and JOB_BACKEND == 'local':
+        get_job_queue()
+
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def persist_upload(data, filename):
+    """
+    Keep a copy of the original upload in UPLOAD_FOLDER, off the request path.
+    Disabled with VERITO_PERSIST_UPLOADS=0 (e.g. on read-only storage).
+    """
+    global _persist_pool
+    if not PERSIST_UPLOADS:
+        return
+    if _persist_pool is None:
+        _persist_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='persist')
+    # Unique name so concurrent uploads of the same file don't clobber each other
+    path = os.path.join(app.config['UPLOAD_FOLDER'], f"{uuid.uuid4().hex}_{filename}")
+    _persist_pool.submit(_write_file, path, data)
+
+
+def _write_file(path, data):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+    except OSError as e:
+        print(f"⚠️  Could not persist upload {path}: {e}")
+
+
+def process_upload(payload):
+    """Background job handler: run the pipeline on one upload held in memory."""
+    return pipeline.run_upload(payload['data'], payload['filename'], payload.get('client_ip'))
+
+
+def get_job_queue():
+    """Start the background worker pool on first use."""
+    global _job_queue
+    if _job_queue is None:
+        # Each worker thread sets up its own Tesseract instances before its first job
+        _job_queue = jobs.JobQueue(process_upload, initializer=pipeline.warm_ocr_thread).start()
+    return _job_queue
+
+
 @app.route('/home', methods=['GET', 'POST'])
 def home():
     flag = None
     risk = None
     stat = None
+    name1 = None
+    per_file = []
     if request.method == 'POST':
         if 'files' not in request.files:
             flash('No file part')
             return redirect(request.url)
         files = request.files.getlist('files')
-        success = False
+        uploads = []
         for file in files:
             if file and allowed_file(file.filename):
                 filename = secure_filename(file.filename)
-                file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-                success = True
-                
-                
-                ##### main processing logic here #####
-                input_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                res = example.process_pdf(input_path, f"output.json")
-                print(f"Processed {filename}, results saved to output.json")
-                flag , risk , stat,name1 = refine.main()
-                
-                
-                 
-        if success:
+                data = file.read()
+                persist_upload(data, filename)
+                uploads.append((filename, data))
+
+        ##### main processing logic here #####
+        # All files of the upload are processed concurrently and judged together
+        if uploads:
+            per_file, combined = pipeline.run_files(uploads, client_ip=request.remote_addr)
+            print(f"Processed {', '.join(name for name, _ in uploads)}")
+            flag, risk, stat, name1 = combined['flags'], combined['risk_score'], combined['status'], combined['name']
             flash('File(s) successfully uploaded')
         else:
             flash('No allowed file(s) selected')
@@ -62,7 +136,8 @@ def home():
         flag = flag,
         name = name1,
         risk = risk,
-        stat = stat,        
+        stat = stat,
+        files = per_file,
         active_tab='upload'
         )
     return render_template(
@@ -86,10 +161,127 @@ def home():
 #         active_tab='dashboard'
 #     )
 
+def enqueue_upload(file, filename, client_ip=None):
+    """
+    Hand one upload to the configured job backend and return its job id.
+    The uploader's address travels with the job for the blacklist rule.
+    """
+    if JOB_BACKEND == 'mongo':
+        return str(workqueue.enqueue(filename, file.read(), client_ip=client_ip))
+
+    data = file.read()
+    job_id = get_job_queue().submit({"data": data, "filename": filename, "client_ip": client_ip},
+                                    filename=filename)
+    persist_upload(data, filename)
+    return job_id
+
+
+def get_job(job_id):
+    if JOB_BACKEND == 'mongo':
+        return workqueue.get_job(job_id)
+    return get_job_queue().get(job_id)
+
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_jobs():
+    """
+    Queue one background job per uploaded file.
+    Returns 202 with the job ids right away; poll /api/jobs/<job_id> for progress.
+    Returns 503 with Retry-After when the queue is full.
+    """
+    files = [f for f in request.files.getlist('files') if f and allowed_file(f.filename)]
+    if not files:
+        return jsonify({"error": "No allowed file(s) selected"}), 400
+
+    accepted = []
+    for file in files:
+        filename = secure_filename(file.filename)
+        try:
+            job_id = enqueue_upload(file, filename, request.remote_addr)
+        except jobs.QueueFull as e:
+            resp = jsonify({"error": str(e), "jobs": accepted})
+            resp.headers['Retry-After'] = '5'
+            return resp, 503
+        accepted.append({
+            "job_id": job_id,
+            "filename": filename,
+            "status_url": url_for('job_status', job_id=job_id),
+        })
+    return jsonify({"jobs": accepted}), 202
+
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    job.pop('result', None)
+    if job['status'] == 'done':
+        job['result_url'] = url_for('job_result', job_id=job_id)
+    return jsonify(job)
+
+
+@app.route('/api/jobs/<job_id>/result')
+def job_result(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job['status'] in ('failed', 'dead'):
+        return jsonify({"job_id": job_id, "status": job['status'], "error": job['error']}), 500
+    if job['status'] != 'done':
+        return jsonify({"job_id": job_id, "status": job['status']}), 202
+    return jsonify({"job_id": job_id, "status": "done", "result": job['result']})
+
+
 #
 # ... (keep all your existing code before this point) ...
 #
 
+def document_row(d):
+    """Shape a stored document into one row of the documents table."""
+    # Use .get() to prevent errors if keys are missing
+    validation_info = d.get('validation') or {}
+    document_info = d.get('document') or {}
+    flags = validation_info.get("flags", [])
+
+    return {
+        "_id": str(d.get('_id')),  # Important: Add the document's unique ID
+        "name": document_info.get("doc_number", "N/A"),
+        "type": (document_info.get("doc_type") or "Unknown").upper(),
+        "status": validation_info.get("status", "Pending"),
+        "risk_score": validation_info.get("risk_score", 0),
+        "flag": flags[0] if flags else "No Flags",
+    }
+
+
+def get_document_page():
+    """
+    Fetch one keyset-paginated page of the documents listing using the
+    request's query string (limit, after, status, type).
+    Raises ValueError for a malformed cursor or page size.
+    """
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    if limit is None or limit < 1:
+        raise ValueError("limit must be a positive integer")
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    after = request.args.get('after') or None
+    if after and not ObjectId.is_valid(after):
+        raise ValueError("Invalid cursor")
+    status = request.args.get('status') or None
+    doc_type = request.args.get('type') or None
+
+    docs, next_cursor = dbintegration.list_documents(
+        limit=limit, before=after, status=status, doc_type=doc_type
+    )
+    return {
+        "documents": [document_row(d) for d in docs],
+        "next_cursor": next_cursor,
+        "limit": limit,
+        "filters": {"status": status, "type": doc_type},
+    }
+
+
 def get_document_data():
     """
     A helper function to fetch all documents from MongoDB and calculate stats.
@@ -98,21 +290,9 @@ def get_document_data():
     all_docs = []
     # Fetch documents from all relevant collections
     for col_name in ['passport', 'pan', 'aadhaar', 'invoice', 'documents']:
-        col = db[col_name]
-        for d in col.find():
-            # Use .get() to prevent errors if keys are missing
-            validation_info = d.get('validation')
-            document_info = d.get('document')
-            flags = validation_info.get("flags", [])
-
-            all_docs.append({
-                "_id": str(d.get('_id')),  # Important: Add the document's unique ID
-                "name": document_info.get("doc_number", "N/A"),
-                "type": document_info.get("doc_type", "Unknown").upper(),
-                "status": validation_info.get("status", "Pending"),
-                "risk_score": validation_info.get("risk_score", 0),
-                "flag": flags[0] if flags else "No Flags",
-            })
+        col = dbintegration.get_db()[col_name]
+        for d in col.find({}, dbintegration.LISTING_PROJECTION):
+            all_docs.append(document_row(d))
 
     total_docs = len(all_docs)
     verified_count = len([doc for doc in all_docs if doc["status"].strip().upper() == "PASS"])
@@ -144,30 +324,74 @@ def dashboard():
 @app.route('/documents')
 def documents():
     """
-    This route fetches the complete list of documents to display in the table.
+    This route fetches one page of documents to display in the table.
+    Use ?after=<next_cursor> to move to the next page, and ?status= / ?type= to filter.
     """
-    data = get_document_data()
+    try:
+        data = get_document_page()
+    except ValueError as e:
+        flash(str(e))
+        return redirect(url_for('documents'))
     return render_template(
         'documents.html',
         documents=data['documents'],
+        next_cursor=data['next_cursor'],
+        limit=data['limit'],
+        filters=data['filters'],
         active_tab='documents'
     )
+
+
+@app.route('/api/documents')
+def list_documents_api():
+    """JSON variant of the documents listing, with the same paging and filters."""
+    try:
+        data = get_document_page()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(data)
     
     
 @app.route('/api/document/<doc_id>')
 def get_single_document(doc_id):
     # Loop through all collections to find the document
     for col_name in ['passport', 'pan', 'aadhaar', 'invoice', 'documents']:
-        col = db[col_name]
+        col = dbintegration.get_db()[col_name]
         try:
             doc = col.find_one({'_id': ObjectId(doc_id)})
         except Exception:
             continue  # Ignore invalid ObjectId or other issues
         if doc:
+            doc = dbintegration.load_payload(doc)  # Heavy OCR fields live in a side collection
             doc['_id'] = str(doc['_id'])  # Ensure ObjectId is serializable
             return jsonify(doc)
     return jsonify({"error": "Document not found"}), 404
 
+
+@app.route('/api/export')
+def export_documents():
+    """
+    Stream stored verification results as NDJSON straight from the database.
+    Filters: ?since=&until= (ISO dates, storage time), ?status=, ?type=; ?gzip=1 compresses.
+    """
+    try:
+        query = export.build_export_query(
+            since=export.parse_date(request.args.get('since')),
+            until=export.parse_date(request.args.get('until')),
+            status=request.args.get('status') or None,
+            doc_type=request.args.get('type') or None,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+    filename = 'verification_results.ndjson' + ('.gz' if compress else '')
+    return Response(
+        export.iter_export(query, compress=compress),
+        mimetype='application/gzip' if compress else 'application/x-ndjson',
+        headers={'Content-Disposition': f'attachment; filename={filename}'},
+    )
+
 #
 # ... (keep all your existing code after this point, like if __name__ == '__main__':) ...
 #
@@ -189,7 +413,7 @@ def chart_data():
     
     all_docs_data = []
     for col_name in ['passport', 'pan', 'aadhaar', 'invoice', 'documents']:
-        all_docs_data.extend(list(db[col_name].aggregate(pipeline)))
+        all_docs_data.extend(list(dbintegration.get_db()[col_name].aggregate(pipeline)))
 
     # Count occurrences of each status and type
     status_counts = Counter(d.get('status', 'Unknown').strip().upper() for d in all_docs_data)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Backfill a document archive: OCR -> refine -> validate -> store for every
+file under a directory (or listed in a manifest), across a process pool.
+
+    python batch.py /archive/kyc --workers 8
+    python batch.py manifest.txt --journal backfill.jsonl
+
+Each finished file is appended to a JSONL journal. Re-running the same
+command skips everything already in the journal, so an interrupted run
+resumes where it stopped (use --retry-failed to redo failed files).
+Throughput (docs/sec, pages/sec) is reported as the run progresses.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import pipeline
+
+# ---------- Config ----------
+DEFAULT_JOURNAL = 'batch_journal.jsonl'
+EXTENSIONS = ('.pdf', '.png', '.jpg', '.jpeg')
+REPORT_EVERY_SECONDS = 10.0
+
+# ---------- inputs ----------
+def iter_sources(source):
+    """Paths under a directory (sorted, recursive) or listed one per line in a manifest."""
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(EXTENSIONS):
+                    yield os.path.join(root, name)
+    else:
+        with open(source, encoding='utf8') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    yield line
+
+def load_journal(path, retry_failed=False):
+    """Paths the journal already accounts for."""
+    seen = set()
+    if not os.path.exists(path):
+        return seen
+    with open(path, encoding='utf8') as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn last line from an interrupted run
+            if rec.get('status') == 'failed' and retry_failed:
+                seen.discard(rec['path'])
+            else:
+                seen.add(rec['path'])
+    return seen
+
+# ---------- worker ----------
+def process_path(path):
+    """Runs in a pool process: full pipeline for one file, returns its journal record."""
+    start = time.perf_counter()
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        results, cumulative = pipeline.verify_upload(data, os.path.basename(path))
+        summary = pipeline.summarize(results, cumulative)
+        # Results are per card/page unit; a page with two cards counts once
+        pages = {(r.get('document') or {}).get('page') for r in results}
+        rec = {'path': path, 'status': 'done', 'pages': len(pages),
+               'verdict': summary['status'], 'risk_score': summary['risk_score'],
+               'elapsed': round(time.perf_counter() - start, 3)}
+        if summary['timed_out_at']:
+            # Partial results are stored; --retry-failed gives the file another go
+            rec.update(status='failed', error=f"Timed out at stage {summary['timed_out_at']}")
+        return rec
+    except Exception as e:
+        return {'path': path, 'status': 'failed', 'pages': 0, 'error': str(e),
+                'elapsed': round(time.perf_counter() - start, 3)}
+
+# ---------- run ----------
+class Progress:
+    def __init__(self, total):
+        self.total = total
+        self.docs = self.pages = self.failed = 0
+        self.start = self.last_report = time.perf_counter()
+
+    def add(self, rec):
+        self.docs += 1
+        self.pages += rec.get('pages', 0)
+        self.failed += rec['status'] == 'failed'
+
+    def report(self, force=False):
+        now = time.perf_counter()
+        if not force and now - self.last_report < REPORT_EVERY_SECONDS:
+            return
+        self.last_report = now
+        elapsed = max(now - self.start, 1e-9)
+        dps = self.docs / elapsed
+        eta = (self.total - self.docs) / dps if dps else float('inf')
+        print(f"🔹 {self.docs}/{self.total} docs ({self.failed} failed) | "
+              f"{dps:.2f} docs/sec | {self.pages / elapsed:.2f} pages/sec | "
+              f"ETA {eta / 60:.1f} min", file=sys.stderr)
+
+def run(source, journal_path=DEFAULT_JOURNAL, workers=None, retry_failed=False):
+    done = load_journal(journal_path, retry_failed)
+    todo = [p for p in iter_sources(source) if p not in done]
+    print(f"Processing {len(todo)} files ({len(done)} already in {journal_path})", file=sys.stderr)
+    progress = Progress(len(todo))
+    if not todo:
+        return progress
+
+    workers = workers or os.cpu_count() or 1
+    pending_paths = iter(todo)
+    with open(journal_path, 'a', encoding='utf8') as journal, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        # Keep a bounded number of files in flight so huge archives don't queue up in memory
+        in_flight = set()
+        for path in pending_paths:
+            in_flight.add(pool.submit(process_path, path))
+            if len(in_flight) >= workers * 2:
+                break
+        try:
+            while in_flight:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    rec = fut.result()
+                    journal.write(json.dumps(rec, ensure_ascii=False) + '\n')
+                    journal.flush()
+                    progress.add(rec)
+                    if rec['status'] == 'failed':
+                        print(f"❌ {rec['path']}: {rec['error']}", file=sys.stderr)
+                    nxt = next(pending_paths, None)
+                    if nxt is not None:
+                        in_flight.add(pool.submit(process_path, nxt))
+                progress.report()
+        except KeyboardInterrupt:
+            print("Interrupted; re-run the same command to resume.", file=sys.stderr)
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+    progress.report(force=True)
+    return progress
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Resumable batch verification of a document archive.")
+    ap.add_argument('source', help="directory to walk, or manifest file with one path per line")
+    ap.add_argument('--journal', default=DEFAULT_JOURNAL, help=f"progress journal (default: {DEFAULT_JOURNAL})")
+    ap.add_argument('--workers', type=int, default=None, help="pool processes (default: CPU count)")
+    ap.add_argument('--retry-failed', action='store_true', help="re-process files that failed before")
+    args = ap.parse_args(argv)
+    try:
+        progress = run(args.source, args.journal, args.workers, args.retry_failed)
+    except KeyboardInterrupt:
+        sys.exit(130)
+    print(f"✅ Done: {progress.docs} docs, {progress.pages} pages, {progress.failed} failed", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Field-extraction microbenchmark: example.extract_fields_from_text against the
+previous multi-pass implementation (kept below as the reference), over a
+corpus of real OCR text. Every output is compared, so a speedup only counts
+if the fields are identical.
+
+    python bench_extract.py                      # output.json, 200 rounds
+    python bench_extract.py corpus.jsonl -n 50 --shuffles 20
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+from dateutil import parser as dateparser
+import example
+from example import AADHAAR_REGEX, DOB_REGEX, NAME_LABELS, PAN_REGEX, YEAR_REGEX
+
+# ---------- reference implementation ----------
+def legacy_find_pan(text):
+    matches = re.findall(PAN_REGEX, text)
+    if matches:
+        for m in matches:
+            cand = m.replace(' ', '').upper()
+            if re.match(r'^[A-Z]{5}\d{4}[A-Z]$', cand):
+                return cand
+        return matches[0].replace(' ', '')
+    return None
+
+def legacy_find_aadhaar(text):
+    matches = re.findall(AADHAAR_REGEX, text)
+    if matches:
+        for m in matches:
+            digits = re.sub(r'\s+', '', m)
+            if len(digits) == 12:
+                return digits
+        return re.sub(r'\s+', '', matches[0])
+    return None
+
+def legacy_find_dates(text):
+    cand = re.findall(DOB_REGEX, text)
+    parsed = []
+    for c in cand:
+        if isinstance(c, tuple):
+            c = ''.join(c)
+        try:
+            dt = dateparser.parse(c, dayfirst=True, fuzzy=True)
+            parsed.append(dt.date().isoformat())
+        except Exception:
+            yr = re.search(YEAR_REGEX, c)
+            if yr:
+                parsed.append(yr.group(0))
+    return list(dict.fromkeys(parsed))
+
+def legacy_find_name_from_lines(text_lines):
+    for i, line in enumerate(text_lines):
+        low = line.strip().lower()
+        if any(lbl in low for lbl in NAME_LABELS):
+            if ':' in line:
+                parts = line.split(':',1)
+                name = parts[1].strip()
+                if name: return name
+            if i+1 < len(text_lines):
+                n = text_lines[i+1].strip()
+                if len(n.split()) <= 5 and len(n)>2:
+                    return n
+    for line in text_lines:
+        if sum(1 for c in line if c.isalpha()) > 4 and line.strip() == line.strip().upper():
+            return line.strip().title()
+    lines = [l.strip() for l in text_lines if len(l.strip())>2]
+    return max(lines, key=len) if lines else None
+
+def legacy_extract(text):
+    out = {}
+    txt = text.replace('\r','\n')
+    lines = [l for l in (ln.strip() for ln in txt.split('\n')) if l]
+    joined = '\n'.join(lines)
+    out['raw_text'] = joined
+    pan = legacy_find_pan(joined)
+    aad = legacy_find_aadhaar(joined)
+    out['doc_number_candidates'] = {'pan': pan, 'aadhaar': aad}
+    out['name_guess'] = legacy_find_name_from_lines(lines)
+    out['dob_candidates'] = legacy_find_dates(joined)
+    father = None
+    for l in lines:
+        if 'father' in l.lower():
+            parts = l.split(':',1)
+            if len(parts)>1 and parts[1].strip():
+                father = parts[1].strip()
+                break
+    out['father_name_guess'] = father
+    if pan:
+        out['doc_type'], out['doc_number'] = 'PAN', pan
+    elif aad:
+        out['doc_type'], out['doc_number'] = 'AADHAAR', aad
+    else:
+        out['doc_type'], out['doc_number'] = 'UNKNOWN', None
+    out['dob'] = out['dob_candidates'][0] if out['dob_candidates'] else None
+    return out
+
+# ---------- benchmark ----------
+def load_corpus(paths, shuffles, seed=0):
+    """raw_text of every JSON line, plus `shuffles` line-shuffled copies of each."""
+    texts = []
+    for path in paths:
+        with open(path, encoding='utf8') as f:
+            for line in f:
+                if line.strip():
+                    text = json.loads(line).get('raw_text')
+                    if text:
+                        texts.append(text)
+    rng = random.Random(seed)
+    variants = []
+    for text in texts:
+        for _ in range(shuffles):
+            lines = text.split('\n')
+            rng.shuffle(lines)
+            variants.append('\n'.join(lines))
+    return texts + variants
+
+def timed(fn, texts, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            fn(text)
+    return time.perf_counter() - start
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark extract_fields_from_text against the old implementation.")
+    ap.add_argument('corpus', nargs='*', default=['output.json'], help="JSONL files with a raw_text field")
+    ap.add_argument('-n', '--rounds', type=int, default=200)
+    ap.add_argument('--shuffles', type=int, default=10, help="line-shuffled variants per text")
+    args = ap.parse_args(argv)
+
+    texts = load_corpus(args.corpus, args.shuffles)
+    mismatches = [t for t in texts if example.extract_fields_from_text(t) != legacy_extract(t)]
+    print(f"{len(texts)} texts, {len(mismatches)} with different output")
+    for text in mismatches[:3]:
+        print(json.dumps(legacy_extract(text), ensure_ascii=False))
+        print(json.dumps(example.extract_fields_from_text(text), ensure_ascii=False))
+
+    old = timed(legacy_extract, texts, args.rounds)
+    new = timed(example.extract_fields_from_text, texts, args.rounds)
+    calls = len(texts) * args.rounds
+    print(f"old {old / calls * 1e6:8.1f} us/text")
+    print(f"new {new / calls * 1e6:8.1f} us/text   ({old / new:.1f}x)")
+
+if __name__ == '__main__':
+    main()
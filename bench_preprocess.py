@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Preprocessing benchmark: time of each profile in example.PREPROCESS_PROFILES
+against the automatically chosen one, per page of the given files. With
+Tesseract available, it also reports how close the OCR text of the chosen
+profile is to the always-heavy baseline (100 = identical).
+
+    python bench_preprocess.py scans/*.pdf image.png
+    python bench_preprocess.py --no-ocr samples/
+"""
+
+import argparse
+import os
+import statistics
+import time
+from fuzzywuzzy import fuzz
+import example
+
+def iter_pages(paths):
+    for path in paths:
+        files = sorted(os.path.join(path, f) for f in os.listdir(path)) if os.path.isdir(path) else [path]
+        for file in files:
+            with open(file, 'rb') as f:
+                data = f.read()
+            for i, page in enumerate(example.load_pages(data, os.path.basename(file)), start=1):
+                yield f"{os.path.basename(file)}#{i}", page
+
+def timed(page, profile):
+    start = time.perf_counter()
+    out = example.preprocess_image(page, profile)
+    return out, time.perf_counter() - start
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Compare preprocessing profiles on sample pages.")
+    ap.add_argument('paths', nargs='+', help="PDF/PNG/JPG files or directories of them")
+    ap.add_argument('--no-ocr', action='store_true', help="only time preprocessing")
+    args = ap.parse_args(argv)
+
+    heavy_times, auto_times, similarities = [], [], []
+    for label, page in iter_pages(args.paths):
+        page = example.Page.of(page)
+        gray = page.level(example.OCR_MAX_SIDE)
+        chosen = example.choose_profile(gray)
+        heavy, heavy_t = timed(page, 'heavy')
+        auto, auto_t = timed(page, None)
+        heavy_times.append(heavy_t)
+        auto_times.append(auto_t)
+        line = (f"{label:<30} noise {example.estimate_noise(gray):5.2f}  {chosen:<5}"
+                f"  heavy {heavy_t * 1000:7.1f} ms  auto {auto_t * 1000:7.1f} ms")
+        if not args.no_ocr:
+            ratio = fuzz.ratio(example.ocr_image(heavy)[0], example.ocr_image(auto)[0])
+            similarities.append(ratio)
+            line += f"  text match {ratio:3d}"
+        print(line)
+
+    if auto_times:
+        print(f"\n{len(auto_times)} pages: heavy {sum(heavy_times):.2f} s, auto {sum(auto_times):.2f} s"
+              f" ({sum(auto_times) / sum(heavy_times):.0%})")
+        if similarities:
+            print(f"text match vs heavy: median {statistics.median(similarities)}, min {min(similarities)}")
+
+if __name__ == '__main__':
+    main()
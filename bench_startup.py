@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark: how long a fresh interpreter takes to import each
+entry module, and how long warm_up() then takes to initialize the heavy
+stack. Every measurement runs in a new subprocess so nothing is cached.
+
+    python bench_startup.py            # default modules, 5 runs each
+    python bench_startup.py -n 10 app worker
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+DEFAULT_MODULES = ['app', 'pipeline', 'dbintegration', 'example', 'refine']
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import {mod}; print(time.perf_counter() - t)"
+WARMUP_SNIPPET = "import app, time; t = time.perf_counter(); app.warm_up(); print(time.perf_counter() - t)"
+
+def time_snippet(snippet, runs):
+    samples = []
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, '-c', snippet], capture_output=True, text=True)
+        if proc.returncode != 0:
+            err = proc.stderr.strip().splitlines()
+            return None, err[-1] if err else f"exit code {proc.returncode}"
+        samples.append(float(proc.stdout.strip().splitlines()[-1]))
+    return samples, None
+
+def report(label, samples, err):
+    if err:
+        print(f"{label:<22} failed: {err}")
+    else:
+        print(f"{label:<22} median {statistics.median(samples) * 1000:8.1f} ms"
+              f"   min {min(samples) * 1000:8.1f} ms")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Measure cold import and warm-up time.")
+    ap.add_argument('modules', nargs='*', default=DEFAULT_MODULES)
+    ap.add_argument('-n', '--runs', type=int, default=5)
+    ap.add_argument('--no-warmup', action='store_true', help="skip timing app.warm_up()")
+    args = ap.parse_args(argv)
+
+    print(f"Cold import time ({args.runs} runs each)")
+    for mod in args.modules:
+        report(f"import {mod}", *time_snippet(IMPORT_SNIPPET.format(mod=mod), args.runs))
+    if not args.no_warmup:
+        report("app.warm_up()", *time_snippet(WARMUP_SNIPPET, args.runs))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,281 @@
+"""
+Blacklist check: names, phone numbers, email domains and IPs.
+
+The lists are plain text files in BLACKLIST_DIR, one entry per line, '#'
+starting a comment:
+
+- names.txt          full names, any order/case/accents ("Ivan Petrov")
+- phones.txt         phone numbers, any formatting ("+91 98765 43210")
+- email_domains.txt  domains; subdomains are covered too ("mailinator.com")
+- ips.txt            addresses or CIDR ranges ("203.0.113.0/24", "2001:db8::/32")
+
+Entries are normalized the same way as the document fields they are compared
+with, then hashed to 64 bits. Names, phones and domains are checked against a
+Bloom filter first, so a clean value (nearly every lookup) costs one hash and
+a few bit tests; the rare Bloom hit is confirmed in a sorted array of the
+hashes (binary search). At 8 bytes per entry plus ~1.8 bytes of Bloom filter,
+tens of millions of entries fit in a few hundred MB, and a lookup stays in
+the microseconds whatever the list size. CIDR ranges go into one hash set of
+network prefixes per prefix length, so an address costs one masked lookup per
+length in use.
+
+Files are re-read when they change: every RELOAD_CHECK_SECONDS a lookup stats
+them, and a changed set is rebuilt on a background thread and swapped in
+whole, so checks keep using the previous lists until the new ones are ready.
+"""
+
+import hashlib
+import ipaddress
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+
+# Optional: unidecode transliterates non-Latin scripts ("Иван" -> "Ivan")
+try:
+    from unidecode import unidecode
+except ImportError:
+    unidecode = None
+
+# ---------- Config ----------
+BLACKLIST_DIR = os.environ.get('VERITO_BLACKLIST_DIR',
+                               os.path.join(os.path.dirname(os.path.abspath(__file__)), 'blacklist'))
+LIST_FILES = {
+    'name': 'names.txt',
+    'phone': 'phones.txt',
+    'email_domain': 'email_domains.txt',
+    'ip': 'ips.txt',
+}
+DEFAULT_COUNTRY_CODE = os.environ.get('VERITO_PHONE_COUNTRY_CODE', '91')  # for national numbers
+BLOOM_FP_RATE = 0.001        # Bloom false positives, each costing one binary search
+RELOAD_CHECK_SECONDS = 5.0   # how often lookups look for changed files
+
+WORD_RE = re.compile(r'[^\W_]+')
+
+_current = None
+_current_lock = threading.Lock()
+_last_check = 0.0
+_reloading = False
+
+# ---------- normalization ----------
+def normalize_name(text):
+    """Case-folded, accent-free (transliterated when unidecode is installed) name tokens, sorted."""
+    if not text:
+        return None
+    if unidecode is not None:
+        text = unidecode(text)
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c)).casefold()
+    words = sorted(WORD_RE.findall(text))
+    return ' '.join(words) or None
+
+def normalize_phone(text):
+    """E.164 form ('+919876543210'); national numbers get DEFAULT_COUNTRY_CODE. None if not a phone."""
+    if not text:
+        return None
+    text = str(text).strip()
+    digits = re.sub(r'\D', '', text)
+    if text.startswith('+'):
+        pass
+    elif digits.startswith('00'):
+        digits = digits[2:]
+    elif len(digits) == 11 and digits.startswith('0'):
+        digits = DEFAULT_COUNTRY_CODE + digits[1:]
+    elif len(digits) == 10:
+        digits = DEFAULT_COUNTRY_CODE + digits
+    if not 8 <= len(digits) <= 15:
+        return None
+    return '+' + digits
+
+def normalize_domain(text):
+    """Lower-case ASCII (IDNA) domain of an email address or bare domain."""
+    if not text:
+        return None
+    domain = str(text).strip().rsplit('@', 1)[-1].strip().rstrip('.').lower()
+    if not domain:
+        return None
+    try:
+        return domain.encode('idna').decode('ascii')
+    except UnicodeError:
+        return domain
+
+def parent_domains(domain):
+    """'a.b.example.com' -> ['a.b.example.com', 'b.example.com', 'example.com', 'com']."""
+    parts = domain.split('.')
+    return ['.'.join(parts[i:]) for i in range(len(parts))]
+
+def digest(value):
+    return int.from_bytes(hashlib.blake2b(value.encode('utf8'), digest_size=8).digest(), 'little')
+
+# ---------- structures ----------
+class HashedSet:
+    """
+    Membership of normalized strings: a Bloom filter over their 64-bit hashes
+    in front of the sorted hashes themselves. Probes use double hashing
+    (low and high 32 bits of the one hash), so a lookup hashes once.
+    """
+    def __init__(self, values):
+        import numpy as np  # imported here so importing refine stays cheap
+        self.uint64 = np.uint64
+        hashes = np.unique(np.fromiter((digest(v) for v in values), dtype=np.uint64))
+        self.hashes = hashes
+        n = max(len(hashes), 1)
+        self.bits = max(64, math.ceil(-n * math.log(BLOOM_FP_RATE) / math.log(2) ** 2))
+        self.k = min(16, max(1, round(self.bits / n * math.log(2))))
+        bloom = np.zeros((self.bits + 7) // 8, dtype=np.uint8)
+        h1 = hashes & np.uint64(0xFFFFFFFF)
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+        for i in range(self.k):
+            pos = (h1 + np.uint64(i) * h2) % np.uint64(self.bits)
+            np.bitwise_or.at(bloom, pos >> np.uint64(3), np.left_shift(1, pos & np.uint64(7)).astype(np.uint8))
+        self.bloom = bloom.tobytes()
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def __contains__(self, value):
+        h = digest(value)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        bloom, bits = self.bloom, self.bits
+        for i in range(self.k):
+            pos = (h1 + i * h2) % bits
+            if not bloom[pos >> 3] & (1 << (pos & 7)):
+                return False
+        i = int(self.hashes.searchsorted(self.uint64(h)))
+        return i < len(self.hashes) and int(self.hashes[i]) == h
+
+
+class NetworkSet:
+    """IPv4/IPv6 addresses and CIDR ranges: per IP version, one set of network prefixes per prefix length."""
+    def __init__(self, networks):
+        self.prefixes = {4: {}, 6: {}}
+        for net in networks:
+            bits = net.max_prefixlen
+            prefix = int(net.network_address) >> (bits - net.prefixlen)
+            self.prefixes[net.version].setdefault(net.prefixlen, set()).add(prefix)
+        self.lengths = {v: sorted(p) for v, p in self.prefixes.items()}
+        self.count = sum(len(s) for p in self.prefixes.values() for s in p.values())
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, address):
+        value, bits = int(address), address.max_prefixlen
+        prefixes = self.prefixes[address.version]
+        for length in self.lengths[address.version]:
+            if (value >> (bits - length)) in prefixes[length]:
+                return True
+        return False
+
+# ---------- loading ----------
+def list_path(kind):
+    return os.path.join(BLACKLIST_DIR, LIST_FILES[kind])
+
+def read_entries(path):
+    """Non-empty, comment-stripped lines of a list file; none when it doesn't exist."""
+    try:
+        with open(path, encoding='utf8') as f:
+            for line in f:
+                entry = line.split('#', 1)[0].strip()
+                if entry:
+                    yield entry
+    except FileNotFoundError:
+        return
+
+def parse_network(entry):
+    try:
+        return ipaddress.ip_network(entry, strict=False)
+    except ValueError:
+        print(f"⚠️  Skipping invalid blacklist IP entry: {entry}")
+        return None
+
+def file_mtimes():
+    mtimes = {}
+    for kind in LIST_FILES:
+        try:
+            mtimes[kind] = os.stat(list_path(kind)).st_mtime_ns
+        except FileNotFoundError:
+            mtimes[kind] = None
+    return mtimes
+
+
+class Blacklist:
+    """One loaded snapshot of every list."""
+    def __init__(self):
+        self.mtimes = file_mtimes()
+        normalize = {'name': normalize_name, 'phone': normalize_phone, 'email_domain': normalize_domain}
+        self.sets = {}
+        for kind, norm in normalize.items():
+            values = (norm(e) for e in read_entries(list_path(kind)))
+            self.sets[kind] = HashedSet(v for v in values if v)
+        networks = (parse_network(e) for e in read_entries(list_path('ip')))
+        self.sets['ip'] = NetworkSet(n for n in networks if n)
+        self.loaded_at = time.time()
+
+    def hits(self, doc, client_ip=None):
+        """
+        [(kind, field)] of every blacklisted value in a refined document and
+        the uploader's address (`client_ip`, never part of the document).
+        """
+        found = []
+        name = normalize_name(' '.join(doc.get(f) or '' for f in ('first_name', 'middle_name', 'last_name')))
+        if name and name in self.sets['name']:
+            found.append(('name', 'name'))
+        phone = normalize_phone(doc.get('phone'))
+        if phone and phone in self.sets['phone']:
+            found.append(('phone', 'phone'))
+        domain = normalize_domain(doc.get('email'))
+        if domain and any(d in self.sets['email_domain'] for d in parent_domains(domain)):
+            found.append(('email_domain', 'email'))
+        if client_ip:
+            try:
+                address = ipaddress.ip_address(str(client_ip).strip())
+            except ValueError:
+                address = None
+            if address is not None and address in self.sets['ip']:
+                found.append(('ip', 'client_ip'))
+        return found
+
+    def stats(self):
+        return {'entries': {kind: len(s) for kind, s in self.sets.items()}, 'loaded_at': self.loaded_at}
+
+
+def _reload():
+    global _current, _reloading
+    try:
+        fresh = Blacklist()
+        with _current_lock:
+            _current = fresh
+        print(f"🔄 Blacklist reloaded: {fresh.stats()['entries']}")
+    except Exception as e:
+        print(f"⚠️  Blacklist reload failed, keeping the previous lists: {e}")
+    finally:
+        _reloading = False
+
+def get_blacklist():
+    """The current snapshot; loaded on first use, rebuilt in the background when a file changes."""
+    global _current, _last_check, _reloading
+    if _current is None:
+        with _current_lock:
+            if _current is None:
+                _current = Blacklist()
+                _last_check = time.monotonic()
+        return _current
+    now = time.monotonic()
+    if now - _last_check >= RELOAD_CHECK_SECONDS:
+        with _current_lock:
+            if now - _last_check >= RELOAD_CHECK_SECONDS and not _reloading:
+                _last_check = now
+                if file_mtimes() != _current.mtimes:
+                    _reloading = True
+                    threading.Thread(target=_reload, name='blacklist-reload', daemon=True).start()
+    return _current
+
+def check(doc, client_ip=None):
+    """Blacklist hits of a refined document and its uploader's address, as [(kind, field)]."""
+    return get_blacklist().hits(doc, client_ip)
+
+def stats():
+    return get_blacklist().stats()
@@ -0,0 +1,125 @@
+"""
+Locate ID cards on a scanned page and cut them out before OCR.
+
+A typical upload is an A4 scan with one or two cards somewhere on it; OCRing
+only the card regions skips the blank paper and scanner noise around them.
+Detection runs on a small level of the page; each card found is then
+perspective-corrected (which also deskews it) from the full-resolution page.
+"""
+
+import os
+import cv2
+import numpy as np
+
+# ---------- Config ----------
+CARD_DETECTION = os.environ.get('VERITO_CARD_DETECTION', '1') == '1'
+DETECT_MAX_SIDE = 1000       # longest side of the level contours are searched on
+MIN_CARD_AREA = 0.02         # fraction of the page a card covers, at least...
+MAX_CARD_AREA = 0.85         # ...and at most (bigger means the page *is* the card)
+CARD_ASPECT = (1.47, 1.71)   # long/short side; ID-1 cards are 85.6 x 54 mm = 1.586
+MIN_CARD_CONTRAST = 15       # gray levels between the card's fill and the paper around it
+MAX_OVERLAP = 0.5            # overlap (of the smaller box) above which two boxes are one card
+
+def order_corners(pts):
+    """Corners as top-left, top-right, bottom-right, bottom-left."""
+    pts = pts.reshape(4, 2).astype(np.float32)
+    s = pts.sum(axis=1)
+    d = np.diff(pts, axis=1).ravel()
+    return np.array([pts[np.argmin(s)], pts[np.argmin(d)],
+                     pts[np.argmax(s)], pts[np.argmax(d)]], dtype=np.float32)
+
+def card_quad(contour):
+    """Four corners of a card-shaped contour, or None."""
+    peri = cv2.arcLength(contour, True)
+    approx = cv2.approxPolyDP(contour, 0.02 * peri, True)
+    if len(approx) == 4 and cv2.isContourConvex(approx):
+        return order_corners(approx)
+    # Rounded corners or a torn edge: fall back to the rotated bounding box
+    return order_corners(cv2.boxPoints(cv2.minAreaRect(contour)))
+
+def quad_size(quad):
+    tl, tr, br, bl = quad
+    width = max(np.linalg.norm(tr - tl), np.linalg.norm(br - bl))
+    height = max(np.linalg.norm(bl - tl), np.linalg.norm(br - tr))
+    return width, height
+
+def overlap(a, b):
+    """Intersection of two axis-aligned boxes over the area of the smaller one."""
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, x2 - x1) * max(0, y2 - y1)
+    smaller = min((a[2] - a[0]) * (a[3] - a[1]), (b[2] - b[0]) * (b[3] - b[1]))
+    return inter / smaller if smaller else 0.0
+
+def solid_card(small, quad):
+    """
+    Whether the quad's inside differs from the paper just around it. A card
+    has a fill of its own; a bordered table or box printed on the page shares
+    the page's paper and fails this.
+    """
+    mask = np.zeros(small.shape[:2], np.uint8)
+    cv2.fillConvexPoly(mask, quad.astype(np.int32), 255)
+    kernel = np.ones((3, 3), np.uint8)
+    inside = cv2.erode(mask, kernel, iterations=4)
+    around = cv2.dilate(mask, kernel, iterations=10) & ~cv2.dilate(mask, kernel, iterations=3)
+    if not inside.any() or not around.any():
+        return False
+    return abs(float(np.median(small[inside > 0])) - float(np.median(small[around > 0]))) >= MIN_CARD_CONTRAST
+
+def detect_quads(small):
+    """Card quads on a small grayscale page, largest first, overlapping ones merged."""
+    page_area = small.shape[0] * small.shape[1]
+    blur = cv2.GaussianBlur(small, (5, 5), 0)
+    edges = cv2.Canny(blur, 30, 100)
+    edges = cv2.dilate(edges, np.ones((3, 3), np.uint8), iterations=2)
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    quads = []
+    for contour in sorted(contours, key=cv2.contourArea, reverse=True):
+        area = cv2.contourArea(contour)
+        if area < MIN_CARD_AREA * page_area:
+            break
+        if area > MAX_CARD_AREA * page_area:
+            continue
+        quad = card_quad(contour)
+        width, height = quad_size(quad)
+        if min(width, height) == 0:
+            continue
+        aspect = max(width, height) / min(width, height)
+        if not CARD_ASPECT[0] <= aspect <= CARD_ASPECT[1]:
+            continue
+        if not solid_card(blur, quad):
+            continue
+        box = (*quad.min(axis=0), *quad.max(axis=0))
+        if any(overlap(box, kept_box) > MAX_OVERLAP for _, kept_box in quads):
+            continue
+        quads.append((quad, box))
+    return [quad for quad, _ in quads]
+
+def warp_card(gray, quad):
+    """Perspective-correct one card out of the full-resolution page, landscape."""
+    width, height = (int(round(v)) for v in quad_size(quad))
+    target = np.array([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]],
+                      dtype=np.float32)
+    matrix = cv2.getPerspectiveTransform(quad, target)
+    card = cv2.warpPerspective(gray, matrix, (width, height), flags=cv2.INTER_LINEAR,
+                               borderMode=cv2.BORDER_REPLICATE)
+    if height > width:
+        card = cv2.rotate(card, cv2.ROTATE_90_CLOCKWISE)
+    return card
+
+def find_cards(page):
+    """
+    Grayscale crops of the cards on a page (an example.Page), in reading order.
+    Returns [] when nothing card-shaped is found, so the caller OCRs the whole page.
+    Only ID-1 proportions with a fill distinct from the paper count as cards,
+    so tables and boxes on statements or invoices are not cut out.
+    """
+    if not CARD_DETECTION:
+        return []
+    small = page.level(DETECT_MAX_SIDE)
+    scale = max(page.shape) / max(small.shape)
+    quads = detect_quads(small)
+    # Top to bottom, then left to right
+    quads.sort(key=lambda q: (round(q[:, 1].min() / (small.shape[0] / 4)), q[:, 0].min()))
+    return [warp_card(page.gray, quad * scale) for quad in quads]
@@ -1,62 +1,218 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, DESCENDING
+from bson import ObjectId, Binary, json_util
 import json
-# Connect to your local MongoDB server
-client = MongoClient("mongodb://localhost:27017/")
+import os
+import threading
+import zlib
 
-# Access (or create) your database
-db = client['document_verification']
+# Your local MongoDB server
+MONGO_URI = os.environ.get('VERITO_MONGO_URI', "mongodb://localhost:27017/")
+DB_NAME = 'document_verification'
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """
+    Connect on first use rather than at import. MongoClient isn't fork-safe,
+    so pre-forked web workers must each create theirs after the fork.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MongoClient(MONGO_URI)
+    return _client
+
+def get_db():
+    # Access (or create) your database
+    return get_client()[DB_NAME]
+
+# Collections for document types; unknown types go to a generic 'documents' collection
+TYPE_COLLECTIONS = {
+    'aadhaar': 'aadhaar',
+    'passport': 'passport',
+    'pan': 'pan',
+    'pan card': 'pan',
+    'tax invoice': 'invoice',
+}
+
+def collection_for(doc_type):
+    return get_db()[TYPE_COLLECTIONS.get(doc_type.lower(), 'documents')]
+
+# Every collection a verified document can end up in (see insert_document)
+DOC_COLLECTIONS = ['passport', 'pan', 'aadhaar', 'invoice', 'documents']
+
+# Only the fields shown in the documents table; raw OCR payloads are never read
+LISTING_PROJECTION = {
+    'document.doc_number': 1,
+    'document.doc_type': 1,
+    'validation.status': 1,
+    'validation.risk_score': 1,
+    'validation.flags': {'$slice': 1},
+}
+
+# Case-insensitive matching for the status/type filters, shared by the
+# listing indexes so the filtered queries can use them
+LISTING_COLLATION = {'locale': 'en', 'strength': 2}
+
+_listing_indexes_ready = False
+
+# Heavy OCR payloads: when enabled (VERITO_SPLIT_PAYLOADS=1) the raw OCR text
+# and candidate lists of each upload are kept, zlib-compressed, in `payloads`,
+# and the stored document carries only `document.payload_id`. They are never
+# stored in the hot collections; without the flag they are not kept at all.
+SPLIT_HEAVY_FIELDS = os.environ.get('VERITO_SPLIT_PAYLOADS', '0') == '1'
+HEAVY_FIELDS = ('raw_text', 'doc_number_candidates', 'dob_candidates')
+PAYLOAD_COLLECTION = 'payloads'
+
+# ---------- heavy payloads ----------
+def heavy_fields(entry):
+    """The HEAVY_FIELDS of an OCR entry, for insert(..., heavy=...)."""
+    return {k: entry[k] for k in HEAVY_FIELDS if k in entry}
+
+def store_payload(heavy):
+    """Compress the heavy fields into the payloads collection and return the new id."""
+    data = zlib.compress(json_util.dumps(heavy, ensure_ascii=False).encode('utf8'))
+    return get_db()[PAYLOAD_COLLECTION].insert_one({'data': Binary(data)}).inserted_id
+
+def load_payload(doc):
+    """Merge a stored document's offloaded heavy fields back into it (no-op if none)."""
+    document = doc.get('document') or {}
+    payload_id = document.get('payload_id')
+    if not payload_id:
+        return doc
+    payload = get_db()[PAYLOAD_COLLECTION].find_one({'_id': payload_id})
+    if payload:
+        document.update(json_util.loads(zlib.decompress(payload['data']).decode('utf8')))
+        del document['payload_id']
+    return doc
+
+def match_query(doc_data):
+    """
+    Filter that finds an already stored copy of doc_data. With split payloads the
+    stored copy carries a payload_id, so the document part is matched field by
+    field instead of as a whole subdocument.
+    """
+    if not SPLIT_HEAVY_FIELDS:
+        return doc_data
+    query = {k: v for k, v in doc_data.items() if k != 'document'}
+    for k, v in doc_data['document'].items():
+        query[f'document.{k}'] = v
+    return query
 
-# Create collections for document types
-aadhaar_col = db['aadhaar']
-passport_col = db['passport']
-pan_col = db['pan']
-invoice_col = db['invoice']
 
 def fin(doc_data):
     doc_data1 = doc_data.get('document')
     doc_type = doc_data1.get("doc_type") or doc_data1.get("document_type")
     if not doc_type:
         raise ValueError("Document type not specified.")
+    doc_data = match_query(doc_data)
+
+    return collection_for(doc_type).find_one(doc_data)
+
 
-    if doc_type.lower() == 'aadhaar':
-        result = aadhaar_col.find_one(doc_data)
-    elif doc_type.lower() == 'passport':
-        result = passport_col.find_one(doc_data)
-    elif doc_type.lower() == 'pan' or doc_type.lower() == 'pan card':
-        result = pan_col.find_one(doc_data)
-    elif doc_type.lower() == 'tax invoice':
-        result = invoice_col.find_one(doc_data)
-    else:
-        # For unknown types, insert in a generic collection
-        result = db['documents'].find_one(doc_data)
-    return result
-
-    
-
-def insert_document(doc_data):
+def insert_document(doc_data, heavy=None):
     doc_data1 = doc_data.get('document')
     doc_type = doc_data1.get("doc_type") or doc_data1.get("document_type")
     if not doc_type:
         raise ValueError("Document type not specified.")
 
-    if doc_type.lower() == 'aadhaar':
-        result = aadhaar_col.insert_one(doc_data)
-    elif doc_type.lower() == 'passport':
-        result = passport_col.insert_one(doc_data)
-    elif doc_type.lower() == 'pan' or doc_type.lower() == 'pan card':
-        result = pan_col.insert_one(doc_data)
-    elif doc_type.lower() == 'tax invoice':
-        result = invoice_col.insert_one(doc_data)
-    else:
-        # For unknown types, insert in a generic collection
-        result = db['documents'].insert_one(doc_data)
+    if SPLIT_HEAVY_FIELDS and heavy:
+        doc_data['document']['payload_id'] = store_payload(heavy)
+
+    result = collection_for(doc_type).insert_one(doc_data)
 
     print(f"Inserted document with id: {result.inserted_id}")
     return result.inserted_id
 
 
-def insert(jstr):
+def insert(jstr, heavy=None):
     json_str = json.dumps(jstr)
     doc_data = json.loads(json_str)
-    insert_document(doc_data)
-    
+    return insert_document(doc_data, heavy)
+
+
+# ---------- listing ----------
+def ensure_listing_indexes():
+    """Create the compound indexes behind the paginated documents listing."""
+    global _listing_indexes_ready
+    if _listing_indexes_ready:
+        return
+    for col_name in DOC_COLLECTIONS:
+        col = get_db()[col_name]
+        col.create_index([('validation.status', 1), ('_id', DESCENDING)],
+                         name='status_id', collation=LISTING_COLLATION)
+        col.create_index([('document.doc_type', 1), ('_id', DESCENDING)],
+                         name='doc_type_id', collation=LISTING_COLLATION)
+        col.create_index([('document.doc_type', 1), ('validation.status', 1), ('_id', DESCENDING)],
+                         name='doc_type_status_id', collation=LISTING_COLLATION)
+    _listing_indexes_ready = True
+
+
+def listing_collation(query):
+    """
+    The case-insensitive collation when the query filters on status or type,
+    else None: the unfiltered `_id` sort can then use the default `_id` index,
+    which has the simple collation.
+    """
+    if 'validation.status' in query or 'document.doc_type' in query:
+        return LISTING_COLLATION
+    return None
+
+
+def build_listing_query(status=None, doc_type=None, before=None):
+    """Mongo filter for the listing: optional status/type plus the keyset cursor."""
+    query = {}
+    if status:
+        query['validation.status'] = status.strip()
+    if doc_type:
+        query['document.doc_type'] = doc_type.strip()
+    if before:
+        query['_id'] = {'$lt': ObjectId(before)}
+    return query
+
+
+def list_documents(limit=50, before=None, status=None, doc_type=None):
+    """
+    Return one page of stored documents, newest first, and the cursor for the next page.
+
+    Pagination is keyset-based on `_id` (ObjectIds grow with insertion time), so
+    every page costs an index range scan of `limit + 1` entries per collection no
+    matter how deep the caller has paged. `before` is the `_id` string of the last
+    document on the previous page; the returned cursor is None on the last page.
+    """
+    ensure_listing_indexes()
+    query = build_listing_query(status, doc_type, before)
+
+    docs = []
+    for col_name in DOC_COLLECTIONS:
+        cursor = (get_db()[col_name]
+                  .find(query, LISTING_PROJECTION, collation=listing_collation(query))
+                  .sort('_id', DESCENDING)
+                  .limit(limit + 1))
+        docs.extend(cursor)
+
+    # Merge the per-collection pages into one global _id order
+    docs.sort(key=lambda d: d['_id'], reverse=True)
+    page = docs[:limit]
+    next_cursor = str(page[-1]['_id']) if len(docs) > limit else None
+    return page, next_cursor
+
+
+def iter_documents(query, projection=None, batch_size=500):
+    """
+    Yield every stored document matching `query`, collection by collection.
+
+    Documents are pulled through batched server-side cursors, so memory use is
+    bounded by `batch_size` however many documents match.
+    """
+    ensure_listing_indexes()
+    for col_name in DOC_COLLECTIONS:
+        cursor = get_db()[col_name].find(query, projection, collation=listing_collation(query),
+                                   batch_size=batch_size)
+        try:
+            yield from cursor
+        finally:
+            cursor.close()
+
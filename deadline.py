@@ -0,0 +1,49 @@
+"""
+Per-document time budget shared by every pipeline stage.
+
+A Deadline is created once per document and handed down through
+rasterization, OCR, refinement, rule evaluation and the DB insert. Each
+stage checks it at its boundaries and caps its blocking calls (Tesseract,
+poppler, Gemini, MongoDB) at the time remaining. When it runs out,
+DeadlineExceeded names the stage and carries whatever finished before it.
+"""
+
+import os
+import time
+
+# ---------- Config ----------
+DOCUMENT_DEADLINE_SECONDS = float(os.environ.get('VERITO_DEADLINE_SECONDS', '120'))
+
+
+class DeadlineExceeded(Exception):
+    def __init__(self, stage, partial=None):
+        super().__init__(f"Timed out at stage {stage}")
+        self.stage = stage
+        self.partial = partial if partial is not None else []
+
+    def __reduce__(self):
+        # Keep stage/partial when the exception crosses a process pool boundary
+        return (DeadlineExceeded, (self.stage, self.partial))
+
+
+class Deadline:
+    def __init__(self, seconds=DOCUMENT_DEADLINE_SECONDS):
+        """`seconds=None` means no time limit."""
+        self.expires_at = None if seconds is None else time.monotonic() + seconds
+
+    def remaining(self):
+        """Seconds left (never negative), or None when unbounded."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def check(self, stage):
+        if self.expired():
+            raise DeadlineExceeded(stage)
+
+
+# Default for callers that don't pass a deadline
+NO_DEADLINE = Deadline(None)
@@ -0,0 +1,176 @@
+"""
+Persistent customer index: links every verified document to a customer
+cluster, across uploads, and checks it against that customer's history.
+
+Documents are linked through blocking keys kept in the `entity_keys`
+collection (one document per key, `_id` = the key):
+
+- doc:<TYPE>:<number>   same document number -> same customer
+- nd:<name>:<dob>       same normalized name and DOB -> same customer
+- n:<name>              name only; never links, but a DOB that differs from
+                        the one customer already known under a rare name is
+                        flagged
+
+Each link costs a handful of indexed `_id` lookups, whatever the size of the
+index. Clusters live in `entities` with the names, DOBs and document numbers
+seen so far; a document linked through one key whose name or DOB disagrees
+with its cluster is flagged. When a document's keys point at two clusters
+they are merged into the older one.
+"""
+
+import os
+import re
+import unicodedata
+from datetime import datetime, timezone
+from difflib import SequenceMatcher
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+import dbintegration
+
+# ---------- Config ----------
+ENTITY_INDEX = os.environ.get('VERITO_ENTITY_INDEX', '1') == '1'
+ENTITIES_COLLECTION = 'entities'
+KEYS_COLLECTION = 'entity_keys'
+NAME_MATCH_THRESHOLD = 0.85   # SequenceMatcher ratio below which names disagree
+NAME_BLOCK_LIMIT = 1          # name-only keys are only trusted for names this rare
+
+_indexes_ready = False
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+def entities_collection():
+    return dbintegration.get_db()[ENTITIES_COLLECTION]
+
+def keys_collection():
+    return dbintegration.get_db()[KEYS_COLLECTION]
+
+def ensure_indexes():
+    """
+    Index the cluster references merge() repoints: entity_id/entity_ids of the
+    keys, and the entity_id stamped on stored documents ("all documents of a customer").
+    """
+    global _indexes_ready
+    if _indexes_ready:
+        return
+    keys_collection().create_index('entity_id', name='entity_id', sparse=True)
+    keys_collection().create_index('entity_ids', name='entity_ids', sparse=True)  # multikey
+    for col_name in dbintegration.DOC_COLLECTIONS:
+        dbintegration.get_db()[col_name].create_index('entity_id', name='entity_id', sparse=True)
+    _indexes_ready = True
+
+# ---------- keys ----------
+def normalize_name(doc):
+    """Upper-case, accent-free name tokens, sorted so word order doesn't matter."""
+    parts = [doc.get("first_name"), doc.get("middle_name"), doc.get("last_name")]
+    text = unicodedata.normalize('NFKD', ' '.join(p for p in parts if p))
+    text = ''.join(c for c in text if not unicodedata.combining(c)).upper()
+    return ' '.join(sorted(re.findall(r'[A-Z]+', text)))
+
+def normalize_number(number):
+    return re.sub(r'[^A-Z0-9]', '', str(number).upper()) if number else ''
+
+def blocking_keys(doc):
+    """(strong keys, name-only key or None) of a refined document."""
+    name = normalize_name(doc)
+    dob = doc.get("dob")
+    number = normalize_number(doc.get("doc_number"))
+    doc_type = (doc.get("doc_type") or "").strip().upper()
+    strong = []
+    if number and doc_type:
+        strong.append(f"doc:{doc_type}:{number}")
+    if name and dob:
+        strong.append(f"nd:{name}:{dob}")
+    return strong, (f"n:{name}" if name else None)
+
+# ---------- linking ----------
+def merge(into_id, other_ids):
+    """Fold the other clusters into `into_id` and repoint their keys and stored documents."""
+    entities = entities_collection()
+    for other_id in other_ids:
+        other = entities.find_one_and_delete({'_id': other_id})
+        if other:
+            entities.update_one({'_id': into_id}, {'$addToSet': {
+                'names': {'$each': other.get('names', [])},
+                'dobs': {'$each': other.get('dobs', [])},
+                'doc_numbers': {'$each': other.get('doc_numbers', [])},
+            }})
+        keys_collection().update_many({'entity_id': other_id}, {'$set': {'entity_id': into_id}})
+        keys_collection().update_many({'entity_ids': other_id}, {'$set': {'entity_ids.$': into_id}})
+        for col_name in dbintegration.DOC_COLLECTIONS:
+            dbintegration.get_db()[col_name].update_many({'entity_id': other_id},
+                                                         {'$set': {'entity_id': into_id}})
+
+def history_flags(doc, entity, name):
+    """Inconsistencies between a document and the customer's earlier documents."""
+    flags = []
+    dob = doc.get("dob")
+    if dob and entity.get('dobs') and dob not in entity['dobs']:
+        flags.append("DOB differs from the customer's earlier documents")
+    if name and entity.get('names') and \
+            max(SequenceMatcher(None, name, known).ratio() for known in entity['names']) < NAME_MATCH_THRESHOLD:
+        flags.append("Name differs from the customer's earlier documents")
+    return flags
+
+def link(doc):
+    """
+    Link a refined document to its customer cluster, creating one if needed.
+    Returns (entity_id, flags); (None, []) when the document has nothing to link on.
+    """
+    if not ENTITY_INDEX:
+        return None, []
+    ensure_indexes()
+    strong, name_key = blocking_keys(doc)
+    if not strong:
+        return None, []
+    name = normalize_name(doc)
+
+    lookup = strong + ([name_key] if name_key else [])
+    hits = {k['_id']: k for k in keys_collection().find({'_id': {'$in': lookup}})}
+    linked = sorted({hits[k]['entity_id'] for k in strong if k in hits})
+
+    flags = []
+    if linked:
+        entity_id, others = linked[0], linked[1:]  # the oldest cluster wins
+        if others:
+            merge(entity_id, others)
+        entity = entities_collection().find_one({'_id': entity_id}) or {}
+        flags.extend(history_flags(doc, entity, name))
+    else:
+        entity_id = str(ObjectId())  # a string, so result records stay JSON-serializable
+        namesakes = hits.get(name_key, {}).get('entity_ids', [])
+        if 0 < len(namesakes) <= NAME_BLOCK_LIMIT:
+            namesake = entities_collection().find_one({'_id': namesakes[0]}, {'dobs': 1}) or {}
+            if doc.get("dob") and namesake.get('dobs') and doc["dob"] not in namesake['dobs']:
+                flags.append("Same name on file with a different DOB")
+
+    now = _now()
+    entities_collection().update_one({'_id': entity_id}, {
+        '$addToSet': {
+            'names': {'$each': [name] if name else []},
+            'dobs': {'$each': [doc["dob"]] if doc.get("dob") else []},
+            'doc_numbers': {'$each': [k for k in strong if k.startswith('doc:')]},
+        },
+        '$set': {'updated_at': now},
+        '$setOnInsert': {'created_at': now},
+    }, upsert=True)
+    for key in strong:
+        # A concurrent upload may have claimed the key first; follow its cluster
+        claimed = keys_collection().find_one_and_update(
+            {'_id': key}, {'$setOnInsert': {'entity_id': entity_id}},
+            upsert=True, return_document=ReturnDocument.AFTER)
+        if claimed['entity_id'] != entity_id:
+            merge(min(claimed['entity_id'], entity_id), [max(claimed['entity_id'], entity_id)])
+            entity_id = min(claimed['entity_id'], entity_id)
+    if name_key:
+        # Only up to NAME_BLOCK_LIMIT + 1 clusters are kept: enough to tell a rare name
+        try:
+            keys_collection().update_one(
+                {'_id': name_key, 'entity_ids': {'$ne': entity_id}},
+                {'$push': {'entity_ids': {'$each': [entity_id], '$slice': NAME_BLOCK_LIMIT + 1}}},
+                upsert=True)
+        except DuplicateKeyError:
+            pass  # already listed
+    return entity_id, flags
@@ -9,14 +9,25 @@ Notes:
 """
 
 import json
+import os
 import re
+import threading
+import time
+from datetime import date
 from pathlib import Path
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, convert_from_bytes
+from pdf2image.exceptions import PDFPopplerTimeoutError
 import pytesseract
 import cv2
 import numpy as np
 from dateutil import parser as dateparser
 from fuzzywuzzy import fuzz
+import ocr_engine
+from cards import find_cards
+from ocr_backends import get_router
+from layouts import read_layout
+from phash import page_hash
+from deadline import DeadlineExceeded, NO_DEADLINE
 
 # ---------- Config ----------
 PDF_PATH = r"C:\\Users\\Darshan\\Desktop\\Innoversite\\Data\\indi.pdf"   # 👈 set your PDF here
@@ -24,6 +35,42 @@ OUTPUT_JSONL = r"output.json"
 POPPLER_PATH = r"C:\\Users\\Darshan\\Downloads\\Release-25.07.0-0\\poppler-25.07.0\\Library\\bin"   # 👈 path to poppler/bin
 pytesseract.pytesseract.tesseract_cmd = r"C:\\Program Files\\Tesseract-OCR\\tesseract.exe"
 
+# Optional: PyMuPDF renders PDFs entirely in memory; without it pdf2image is used
+try:
+    import fitz
+except ImportError:
+    fitz = None
+
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg'}
+
+# Preprocessing profiles, picked per page from a quick noise probe.
+# denoise: fastNlMeansDenoising (h, template window, search window) or None;
+# block/C: adaptive threshold parameters, the pre-profile values (25, 12) for
+# every profile until other values are measured against OCR accuracy.
+PREPROCESS_PROFILES = {
+    'skip':  {'denoise': None,        'block': 25, 'C': 12},
+    'light': {'denoise': (5, 5, 11),  'block': 25, 'C': 12},
+    'heavy': {'denoise': (10, 7, 21), 'block': 25, 'C': 12},
+}
+NOISE_SKIP_BELOW = 2.5    # estimated noise sigma (grey levels) of a clean scan
+NOISE_HEAVY_ABOVE = 8.0
+PROBE_SIZE = 512          # longest side of the probe image
+OCR_MAX_SIDE = 2000       # pages are downscaled to this before OCR
+PHASH_LEVEL = 256         # perceptual hashes are taken from this level
+
+# Script/orientation detection picks the OCR languages per card or page:
+# confidently Latin text is read with English alone, anything with another
+# script (Devanagari on bilingual Aadhaar cards) with English + Hindi.
+SCRIPT_DETECTION = os.environ.get('VERITO_SCRIPT_DETECTION', '1') == '1'
+DEFAULT_LANG = 'eng'      # when detection is off or finds too little text
+MULTI_LANG = 'eng+hin'
+SCRIPT_LANGS = {'Latin': 'eng'}
+SCRIPT_MIN_CONF = 1.0     # OSD script confidence needed to trust a single script
+OSD_MAX_SIDE = 1200       # detection runs on a copy this size
+ROTATIONS = {90: cv2.ROTATE_90_CLOCKWISE, 180: cv2.ROTATE_180, 270: cv2.ROTATE_90_COUNTERCLOCKWISE}
+# Immerkaer noise estimation kernel
+NOISE_KERNEL = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+
 # ---------- Regex patterns ----------
 PAN_REGEX = r'\b([A-Z]{5}[0-9]{4}[A-Z])\b'
 AADHAAR_REGEX = r'\b([0-9]{4}\s?[0-9]{4}\s?[0-9]{4})\b'
@@ -39,83 +86,265 @@ GENDER_LABELS = ['male', 'female', 'm', 'f']
 def pdf_to_images(pdf_path, dpi=300):
     return convert_from_path(pdf_path, dpi=dpi, poppler_path=POPPLER_PATH)
 
-def preprocess_image(pil_image):
-    img = np.array(pil_image)
-    if img.ndim == 3:
-        img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    h, w = gray.shape
-    if max(h, w) > 2000:
-        scale = 2000 / max(h, w)
-        gray = cv2.resize(gray, (int(w*scale), int(h*scale)), interpolation=cv2.INTER_AREA)
-    gray = cv2.fastNlMeansDenoising(gray, None, h=10)
+def pdf_bytes_to_images(data, dpi=300, deadline=None):
+    """Render PDF bytes to pages: grayscale arrays via PyMuPDF, else PIL images via poppler."""
+    deadline = deadline or NO_DEADLINE
+    if fitz is not None:
+        pages = []
+        with fitz.open(stream=data, filetype='pdf') as doc:
+            for page in doc:
+                deadline.check('rasterize')
+                pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+                arr = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)
+                pages.append(arr[:, :pix.width])
+        return pages
+    try:
+        return convert_from_bytes(data, dpi=dpi, poppler_path=POPPLER_PATH,
+                                  timeout=deadline.remaining())
+    except PDFPopplerTimeoutError as e:
+        raise DeadlineExceeded('rasterize') from e
+
+def decode_image(data):
+    """Decode PNG/JPG bytes straight into a grayscale array."""
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        raise ValueError("Could not decode image")
+    return img
+
+def load_pages(data, filename, deadline=None):
+    """Pages of an uploaded file given as bytes: PDFs are rendered, images decoded directly."""
+    ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if ext in IMAGE_EXTENSIONS:
+        return [decode_image(data)]
+    return pdf_bytes_to_images(data, dpi=300, deadline=deadline)
+
+def page_to_gray(page):
+    """Grayscale uint8 array of a page, whether a PIL image or an already decoded array."""
+    if isinstance(page, Page):
+        return page.gray
+    if isinstance(page, np.ndarray):
+        return page if page.ndim == 2 else cv2.cvtColor(page, cv2.COLOR_RGB2GRAY)
+    return np.array(page.convert('L'))
+
+class Page:
+    """
+    One page decoded once into a grayscale uint8 buffer, plus downscaled levels
+    built on demand and cached. Preprocessing, quality scoring and detectors all
+    read from the same page instead of converting the original image again.
+    """
+    def __init__(self, gray):
+        self.gray = gray
+        self._levels = {}
+
+    @classmethod
+    def of(cls, page):
+        """Wrap a PIL image or array (a Page is returned as is)."""
+        return page if isinstance(page, Page) else cls(page_to_gray(page))
+
+    @property
+    def shape(self):
+        return self.gray.shape
+
+    def level(self, max_side):
+        """The page scaled so its longest side is at most max_side (never upscaled)."""
+        h, w = self.gray.shape
+        if max(h, w) <= max_side:
+            return self.gray
+        if max_side not in self._levels:
+            # Downscale from the smallest cached level that is still big enough
+            bigger = [lvl for side, lvl in self._levels.items() if side > max_side]
+            src = min(bigger, key=lambda a: a.size) if bigger else self.gray
+            scale = max_side / max(h, w)
+            self._levels[max_side] = cv2.resize(src, (int(w*scale), int(h*scale)),
+                                                interpolation=cv2.INTER_AREA)
+        return self._levels[max_side]
+
+def estimate_noise(gray):
+    """
+    Noise sigma of a grayscale page, from a probe of at most PROBE_SIZE px.
+    The probe takes every n-th pixel instead of averaging (which would smooth the
+    noise away), and the median keeps text edges from counting as noise.
+    """
+    step = max(1, -(-max(gray.shape) // PROBE_SIZE))
+    probe = gray[::step, ::step].astype(np.float32)
+    lap = cv2.filter2D(probe, -1, NOISE_KERNEL)[1:-1, 1:-1]
+    return float(np.median(np.abs(lap))) * 1.4826 / 6.0
+
+def choose_profile(gray):
+    noise = estimate_noise(gray)
+    if noise < NOISE_SKIP_BELOW:
+        return 'skip'
+    if noise > NOISE_HEAVY_ABOVE:
+        return 'heavy'
+    return 'light'
+
+# Pages and seconds spent per profile (probe included), for tuning the thresholds
+PREPROCESS_STATS = {name: {'pages': 0, 'seconds': 0.0} for name in PREPROCESS_PROFILES}
+_stats_lock = threading.Lock()
+
+def preprocess_stats():
+    with _stats_lock:
+        return {name: dict(s) for name, s in PREPROCESS_STATS.items()}
+
+def preprocess_image(pil_image, profile=None):
+    """
+    Binarized page for OCR, from a Page (or a PIL image / array, wrapped on the fly).
+    `profile` forces one of PREPROCESS_PROFILES instead of probing.
+    """
+    start = time.perf_counter()
+    gray = Page.of(pil_image).level(OCR_MAX_SIDE)
+    profile = profile or choose_profile(gray)
+    params = PREPROCESS_PROFILES[profile]
+    if params['denoise']:
+        strength, template, search = params['denoise']
+        gray = cv2.fastNlMeansDenoising(gray, None, h=strength,
+                                        templateWindowSize=template, searchWindowSize=search)
     th = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                               cv2.THRESH_BINARY, 25, 12)
-    kernel = np.ones((1,1), np.uint8)
-    th = cv2.morphologyEx(th, cv2.MORPH_OPEN, kernel)
+                               cv2.THRESH_BINARY, params['block'], params['C'])
+    with _stats_lock:
+        PREPROCESS_STATS[profile]['pages'] += 1
+        PREPROCESS_STATS[profile]['seconds'] += time.perf_counter() - start
     return th
 
-def ocr_image(cv_image, lang='eng'):
-    text = pytesseract.image_to_string(cv_image, lang=lang)
+def ocr_image(cv_image, lang='eng', deadline=None):
+    """Text + word data of one image; the call is abandoned once the deadline passes."""
+    return ocr_images([cv_image], lang=lang, deadline=deadline)[0]
+
+def ocr_images(images, lang='eng', deadline=None):
+    """[(text, data)] for a batch of images, each sent to the OCR backend the router picks."""
+    deadline = deadline or NO_DEADLINE
+    try:
+        out = get_router().recognize_batch(images, lang=lang, timeout=_tesseract_timeout(deadline))
+    except RuntimeError as e:
+        if 'timeout' in str(e).lower():
+            raise DeadlineExceeded('ocr') from e
+        raise
+    deadline.check('ocr')
+    return out
+
+def _tesseract_timeout(deadline):
+    # pytesseract treats 0 as "no timeout"; an exhausted budget still gets a token slice
+    remaining = deadline.remaining()
+    if remaining is None:
+        return 0
+    return max(remaining, 0.01)
+
+def image_quality(page):
+    """Blur and contrast scores in [0, 1] from the full-resolution page."""
     try:
-        data = pytesseract.image_to_data(cv_image, lang=lang, output_type=pytesseract.Output.DICT)
+        gray = Page.of(page).gray
+        # 16-bit Laplacian is exact for uint8 input and a quarter the size of CV_64F
+        _, lap_std = cv2.meanStdDev(cv2.Laplacian(gray, cv2.CV_16S))
+        lap = float(lap_std[0][0]) ** 2
+        blur_score = 1.0 if lap < 50 else 0.0 if lap > 300 else (300-lap)/250.0
+        contrast_score = float(cv2.meanStdDev(gray)[1][0][0])/128.0
+        return {
+            'blur_score': min(max(0.0, blur_score), 1.0),
+            'contrast_score': min(max(0.0, contrast_score), 1.0)
+        }
     except Exception:
-        data = None
-    return text, data
+        return {'blur_score': None, 'contrast_score': None}
 
 # ---------- extraction ----------
+# All number and date patterns in one lookahead alternation, so one finditer
+# walks the text once; each pattern keeps re.findall's non-overlapping matches.
+# The leading character class lets the regex engine skip ahead to candidates.
+FIELD_SCANNER = re.compile(
+    rf'(?=[\dA-Z])(?=(?P<pan>{PAN_REGEX})|(?P<aadhaar>{AADHAAR_REGEX})|(?P<date>{DOB_REGEX}))')
+YEAR_RE = re.compile(YEAR_REGEX)
+NAME_LABEL_RE = re.compile('|'.join(re.escape(lbl) for lbl in NAME_LABELS))
+WHITESPACE_RE = re.compile(r'\s+')
+# Fully numeric dates with one repeated separator: DD?MM?YYYY or YYYY?MM?DD
+STRICT_DATE = re.compile(r'(\d{2})([/\- ])(\d{2})\2(\d{4})|(\d{4})([/\- ])(\d{2})\6(\d{2})')
+
+def scan_text(text):
+    """All PAN, Aadhaar and date candidates of a text, in order, from a single pass."""
+    found = {'pan': [], 'aadhaar': [], 'date': []}
+    ends = dict.fromkeys(found, 0)
+    for m in FIELD_SCANNER.finditer(text):
+        kind = m.lastgroup
+        if m.start() >= ends[kind]:
+            found[kind].append(m.group(kind))
+            ends[kind] = m.end(kind)
+    return found
+
+def strict_date(c):
+    """
+    ISO date of a strictly formatted candidate, read the way dateutil's
+    parse(dayfirst=True) does, without its tokenizer: DD/MM unless the month
+    can't be, and YYYY-MM-DD read as YYYY-DD-MM whenever that is a valid date.
+    None for anything else (left to dateutil).
+    """
+    m = STRICT_DATE.fullmatch(c)
+    if not m:
+        return None
+    if m.group(1):
+        a, b, year = int(m.group(1)), int(m.group(3)), int(m.group(4))
+        day, month = (a, b) if b <= 12 else (b, a)
+    else:
+        year, a, b = int(m.group(5)), int(m.group(7)), int(m.group(8))
+        month, day = (b, a) if (a > 12 or b <= 12) else (a, b)
+    if year < 1000:
+        return None  # dateutil reads short years differently
+    try:
+        return date(year, month, day).isoformat()
+    except ValueError:
+        return None
+
+def parse_date(c):
+    """ISO date of a date candidate, or its year if it doesn't parse, or None."""
+    iso = strict_date(c)
+    if iso:
+        return iso
+    try:
+        return dateparser.parse(c, dayfirst=True, fuzzy=True).date().isoformat()
+    except Exception:
+        yr = YEAR_RE.search(c)
+        return yr.group(0) if yr else None
+
 def find_pan(text):
-    matches = re.findall(PAN_REGEX, text)
-    if matches:
-        for m in matches:
-            cand = m.replace(' ', '').upper()
-            if re.match(r'^[A-Z]{5}\d{4}[A-Z]$', cand):
-                return cand
-        return matches[0].replace(' ', '')
-    return None
+    pans = scan_text(text)['pan']
+    return pans[0] if pans else None
 
 def find_aadhaar(text):
-    matches = re.findall(AADHAAR_REGEX, text)
-    if matches:
-        for m in matches:
-            digits = re.sub(r'\s+', '', m)
-            if len(digits) == 12:
-                return digits
-        return re.sub(r'\s+', '', matches[0])
-    return None
+    numbers = scan_text(text)['aadhaar']
+    return WHITESPACE_RE.sub('', numbers[0]) if numbers else None
 
 def find_dates(text):
-    cand = re.findall(DOB_REGEX, text)
-    parsed = []
-    for c in cand:
-        if isinstance(c, tuple):
-            c = ''.join(c)
-        try:
-            dt = dateparser.parse(c, dayfirst=True, fuzzy=True)
-            parsed.append(dt.date().isoformat())
-        except Exception:
-            yr = re.search(YEAR_REGEX, c)
-            if yr:
-                parsed.append(yr.group(0))
-    return list(dict.fromkeys(parsed))
+    parsed = (parse_date(c) for c in scan_text(text)['date'])
+    return list(dict.fromkeys(p for p in parsed if p))
+
+def scan_lines(lines):
+    """
+    (name_guess, father_name_guess) from one walk over stripped lines. The name
+    is the value of the first 'name' label that has one, else the first
+    all-caps line, else the longest line.
+    """
+    labelled = upper = longest = father = None
+    for i, line in enumerate(lines):
+        low = line.lower()
+        if father is None and 'father' in low:
+            parts = line.split(':', 1)
+            if len(parts) > 1 and parts[1].strip():
+                father = parts[1].strip()
+        if labelled is None:
+            if NAME_LABEL_RE.search(low):
+                if ':' in line:
+                    labelled = line.split(':', 1)[1].strip() or None
+                if labelled is None and i+1 < len(lines):
+                    n = lines[i+1]
+                    if len(n.split()) <= 5 and len(n) > 2:
+                        labelled = n
+            if upper is None and line == line.upper() and sum(1 for c in line if c.isalpha()) > 4:
+                upper = line.title()
+            if len(line) > 2 and (longest is None or len(line) > len(longest)):
+                longest = line
+        elif father is not None:
+            break
+    return labelled or upper or longest, father
 
 def find_name_from_lines(text_lines):
-    for i, line in enumerate(text_lines):
-        low = line.strip().lower()
-        if any(lbl in low for lbl in NAME_LABELS):
-            if ':' in line:
-                parts = line.split(':',1)
-                name = parts[1].strip()
-                if name: return name
-            if i+1 < len(text_lines):
-                n = text_lines[i+1].strip()
-                if len(n.split()) <= 5 and len(n)>2:
-                    return n
-    for line in text_lines:
-        if sum(1 for c in line if c.isalpha()) > 4 and line.strip() == line.strip().upper():
-            return line.strip().title()
-    lines = [l.strip() for l in text_lines if len(l.strip())>2]
-    return max(lines, key=len) if lines else None
+    return scan_lines([line.strip() for line in text_lines])[0]
 
 def extract_fields_from_text(text):
     out = {}
@@ -124,21 +353,15 @@ def extract_fields_from_text(text):
     joined = '\n'.join(lines)
     out['raw_text'] = joined
 
-    pan = find_pan(joined)
-    aad = find_aadhaar(joined)
+    found = scan_text(joined)
+    pan = found['pan'][0] if found['pan'] else None
+    aad = WHITESPACE_RE.sub('', found['aadhaar'][0]) if found['aadhaar'] else None
     out['doc_number_candidates'] = {'pan': pan, 'aadhaar': aad}
-    name_guess = find_name_from_lines(lines)
-    dob_candidates = find_dates(joined)
+    name_guess, father = scan_lines(lines)
+    parsed = (parse_date(c) for c in found['date'])
+    dob_candidates = list(dict.fromkeys(p for p in parsed if p))
     out['name_guess'] = name_guess
     out['dob_candidates'] = dob_candidates
-
-    father = None
-    for l in lines:
-        if 'father' in l.lower():
-            parts = l.split(':',1)
-            if len(parts)>1 and parts[1].strip():
-                father = parts[1].strip()
-                break
     out['father_name_guess'] = father
 
     if pan:
@@ -154,15 +377,108 @@ def extract_fields_from_text(text):
     out['dob'] = dob_candidates[0] if dob_candidates else None
     return out
 
+def fields_from_layout(layout, values):
+    """Fields in the extract_fields_from_text shape from the values a layout template read."""
+    lines = [f"{field['label']}: {values[name]}" if field['label'] else values[name]
+             for name, field in layout['fields'].items() if values.get(name)]
+    fields = extract_fields_from_text('\n'.join(lines))
+    fields['doc_type'] = layout['doc_type']
+    fields['doc_number'] = values[layout['key']]
+    fields['name_guess'] = values.get('name') or fields['name_guess']
+    fields['father_name_guess'] = values.get('father_name') or fields['father_name_guess']
+    fields['layout'] = layout['name']
+    return fields
+
 # ---------- pipeline ----------
-def process_pdf(input_pdf, output_jsonl_path):
-    pages = pdf_to_images(input_pdf, dpi=300)
-    results = []
-    for page_idx, pil_img in enumerate(pages, start=1):
-        img = preprocess_image(pil_img)
-        text, data = ocr_image(img, lang='eng')
-        fields = extract_fields_from_text(text)
+def orient_and_pick_lang(img, deadline):
+    """Upright the image per Tesseract OSD and pick its OCR languages; returns (img, lang)."""
+    if not SCRIPT_DETECTION or 'osd' not in ocr_engine.installed_languages():
+        return img, DEFAULT_LANG
+    h, w = img.shape[:2]
+    probe = img
+    if max(h, w) > OSD_MAX_SIDE:
+        scale = OSD_MAX_SIDE / max(h, w)
+        probe = cv2.resize(img, (int(w*scale), int(h*scale)), interpolation=cv2.INTER_AREA)
+    try:
+        osd = ocr_engine.detect_orientation(probe, timeout=_tesseract_timeout(deadline))
+    except RuntimeError as e:
+        if 'timeout' in str(e).lower():
+            raise DeadlineExceeded('ocr') from e
+        raise
+    if not osd:
+        return img, DEFAULT_LANG
+    if osd['rotate'] in ROTATIONS:
+        img = cv2.rotate(img, ROTATIONS[osd['rotate']])
+    if osd['script_conf'] >= SCRIPT_MIN_CONF and osd['script'] in SCRIPT_LANGS:
+        return img, ocr_engine.usable_lang(SCRIPT_LANGS[osd['script']], DEFAULT_LANG)
+    # Packs missing from this Tesseract install are dropped ('eng' when none is left)
+    return img, ocr_engine.usable_lang(MULTI_LANG, DEFAULT_LANG)
 
+def read_card_layout(img, deadline):
+    """(fields, data) of a card matching a layout template, else None."""
+    try:
+        match = read_layout(img, timeout=_tesseract_timeout(deadline))
+    except RuntimeError as e:
+        if 'timeout' in str(e).lower():
+            raise DeadlineExceeded('ocr') from e
+        raise
+    if not match:
+        return None
+    layout, values, confs, key_confs = match
+    return fields_from_layout(layout, values), {'conf': confs, 'key_conf': key_confs}
+
+def number_conf(number, data):
+    """
+    Lowest confidence (0-1) of the OCR words that make up a document number, so
+    one doubtful digit isn't hidden in the page mean. None when it can't be
+    located in the word data.
+    """
+    if not number or not data:
+        return None
+    if 'key_conf' in data:
+        confs = [c for c in data['key_conf'] if c >= 0]
+        return min(confs) / 100.0 if confs else None
+    target = re.sub(r'[^0-9A-Z]', '', number.upper())
+    words = [(re.sub(r'[^0-9A-Z]', '', str(w).upper()), c)
+             for w, c in zip(data.get('text') or [], data.get('conf') or [])]
+    words = [(w, float(c)) for w, c in words if w]
+    for i in range(len(words)):
+        joined, confs = '', []
+        for w, c in words[i:i + len(target)]:
+            joined += w
+            confs.append(c)
+            if target in joined:
+                return min(confs) / 100.0
+            if len(joined) >= len(target) + len(words[i][0]):
+                break
+    return None
+
+def process_units(units, deadline, are_cards=False):
+    """
+    Preprocess, OCR and extract the fields of the cards (or the whole page) of one
+    page. Each unit is uprighted and gets its languages from script detection.
+    Cards matching a layout template are read field by field; the rest go to the
+    OCR backends, one batch per language set.
+    """
+    imgs = []
+    for unit in units:
+        deadline.check('preprocess')
+        imgs.append(preprocess_image(unit))
+    deadline.check('ocr')
+    imgs, langs = zip(*(orient_and_pick_lang(img, deadline) for img in imgs))
+    read = [read_card_layout(img, deadline) if are_cards else None for img in imgs]
+    # One batch per language set
+    for lang in set(langs):
+        pending = [i for i, r in enumerate(read) if r is None and langs[i] == lang]
+        if not pending:
+            continue
+        for i, (text, data) in zip(pending, ocr_images([imgs[i] for i in pending], lang=lang, deadline=deadline)):
+            read[i] = (extract_fields_from_text(text), data)
+
+    out = []
+    for unit, lang, (fields, data) in zip(units, langs, read):
+        fields['ocr_lang'] = lang
+        fields['phash'] = page_hash(unit.level(PHASH_LEVEL))
         # --- FIXED confidence block ---
         if data and 'conf' in data:
             confs = []
@@ -176,28 +492,74 @@ def process_pdf(input_pdf, output_jsonl_path):
             fields['ocr_conf_mean'] = sum(confs)/len(confs)/100.0 if confs else None
         else:
             fields['ocr_conf_mean'] = None
+        fields['doc_number_conf'] = number_conf(fields.get('doc_number'), data)
 
         # --- Image quality ---
+        fields['image_quality'] = image_quality(unit)
+        out.append(fields)
+    return out
+
+def process_pdf(input_pdf, output_jsonl_path=None):
+    """OCR every page of the PDF and return one field dict per page.
+    The results are also written as JSON lines when output_jsonl_path is given."""
+    pages = pdf_to_images(input_pdf, dpi=300)
+    return process_pages(pages, output_jsonl_path)
+
+def process_document(data, filename, output_jsonl_path=None, deadline=None):
+    """Same as process_pdf for an upload held in memory (PDF, PNG or JPG bytes)."""
+    pages = load_pages(data, filename, deadline=deadline)
+    return process_pages(pages, output_jsonl_path, deadline=deadline)
+
+def process_pages(pages, output_jsonl_path=None, deadline=None):
+    """
+    OCR already rendered pages. Every card found on a page is read as its own
+    unit (one field dict each, numbered by 'card'); a page without recognizable
+    cards, or whose cards yield no document number, is read whole. That second
+    read is recorded as 'ocr_fallback' with the seconds spent on the cards
+    first, and is skipped (keeping the card fields) when the time left is less
+    than the cards took. If the deadline runs out, DeadlineExceeded carries the
+    units finished so far as its `partial`.
+    """
+    deadline = deadline or NO_DEADLINE
+    results = []
+    for page_idx, page in enumerate(pages, start=1):
+        page = Page.of(page)
+        cards = [Page(card) for card in find_cards(page)]
         try:
-            arr = np.array(pil_img.convert('L'))
-            lap = cv2.Laplacian(arr, cv2.CV_64F).var()
-            blur_score = 1.0 if lap < 50 else 0.0 if lap > 300 else (300-lap)/250.0
-            contrast_score = float(np.std(arr))/128.0
-            fields['image_quality'] = {
-                'blur_score': min(max(0.0, blur_score), 1.0),
-                'contrast_score': min(max(0.0, contrast_score), 1.0)
-            }
-        except Exception:
-            fields['image_quality'] = {'blur_score': None, 'contrast_score': None}
-
-        fields['page'] = page_idx
-        fields['name_match_score'] = None
-        results.append(fields)
-
-    out_path = Path(output_jsonl_path)
-    with out_path.open('w', encoding='utf8') as f:
-        for r in results:
-            f.write(json.dumps(r, ensure_ascii=False) + '\n')
+            if not cards:
+                unit_fields, fallback = process_units([page], deadline), None
+            else:
+                started = time.monotonic()
+                unit_fields = process_units(cards, deadline, are_cards=True)
+                card_seconds = round(time.monotonic() - started, 3)
+                fallback = None
+                if not any(f.get('doc_number') for f in unit_fields):
+                    # No card yielded a document number: read the whole page, so text
+                    # outside a misdetected card (a statement's table) isn't lost,
+                    # unless that second read (about the cost of the first) can't fit
+                    remaining = deadline.remaining()
+                    if remaining is not None and remaining < card_seconds:
+                        fallback = 'skipped'
+                    else:
+                        fallback = 'whole_page'
+                        cards, unit_fields = [], process_units([page], deadline)
+        except DeadlineExceeded as e:
+            raise DeadlineExceeded(e.stage, partial=results) from e
+        if fallback:
+            for fields in unit_fields:
+                fields['ocr_fallback'] = {'mode': fallback, 'card_seconds': card_seconds}
+        for card_idx, fields in enumerate(unit_fields, start=1):
+            fields['page'] = page_idx
+            if cards:
+                fields['card'] = card_idx
+            fields['name_match_score'] = None
+            results.append(fields)
+
+    if output_jsonl_path:
+        out_path = Path(output_jsonl_path)
+        with out_path.open('w', encoding='utf8') as f:
+            for r in results:
+                f.write(json.dumps(r, ensure_ascii=False) + '\n')
     return results
 
 # ---------- run directly ----------
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Stream stored verification results as NDJSON (one JSON document per line).
+Backs the /api/export endpoint and can be run directly as a CLI:
+
+    python export.py --since 2025-01-01 --status PASS --gzip -o results.ndjson.gz
+
+The date range applies to the time a document was stored (taken from its
+ObjectId), so it is served by the `_id` index. Memory use stays constant
+regardless of how many documents match.
+"""
+
+import argparse
+import sys
+import zlib
+from datetime import datetime, timezone
+from bson import ObjectId, json_util
+import dbintegration
+
+# ---------- Config ----------
+EXPORT_BATCH_SIZE = 500         # documents per MongoDB getMore
+EXPORT_CHUNK_BYTES = 64 * 1024  # NDJSON bytes buffered before each write
+GZIP_LEVEL = 6
+
+# ---------- query ----------
+def parse_date(value):
+    """Parse an ISO date/datetime string; naive values are taken as UTC."""
+    if not value:
+        return None
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+def build_export_query(since=None, until=None, status=None, doc_type=None):
+    """Listing filter plus an `_id` range for [since, until)."""
+    query = dbintegration.build_listing_query(status, doc_type)
+    id_range = {}
+    if since:
+        id_range['$gte'] = ObjectId.from_datetime(since)
+    if until:
+        id_range['$lt'] = ObjectId.from_datetime(until)
+    if id_range:
+        query['_id'] = id_range
+    return query
+
+# ---------- streaming ----------
+def iter_ndjson(query):
+    """Yield NDJSON-encoded chunks of roughly EXPORT_CHUNK_BYTES."""
+    buf = []
+    size = 0
+    for doc in dbintegration.iter_documents(query, batch_size=EXPORT_BATCH_SIZE):
+        doc = dbintegration.load_payload(doc)
+        line = (json_util.dumps(doc, ensure_ascii=False) + '\n').encode('utf8')
+        buf.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield b''.join(buf)
+            buf, size = [], 0
+    if buf:
+        yield b''.join(buf)
+
+def gzip_stream(chunks, level=GZIP_LEVEL):
+    """Compress a stream of byte chunks into a single gzip member on the fly."""
+    comp = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        out = comp.compress(chunk)
+        if out:
+            yield out
+    yield comp.flush()
+
+def iter_export(query, compress=False):
+    chunks = iter_ndjson(query)
+    return gzip_stream(chunks) if compress else chunks
+
+# ---------- run directly ----------
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Export stored verification results as NDJSON.")
+    ap.add_argument('--since', help="only documents stored on/after this ISO date (UTC)")
+    ap.add_argument('--until', help="only documents stored before this ISO date (UTC)")
+    ap.add_argument('--status', help="validation status, e.g. PASS, REJECTED, ESCALATE")
+    ap.add_argument('--type', dest='doc_type', help="document type, e.g. PAN, Passport")
+    ap.add_argument('--gzip', action='store_true', help="gzip-compress the output")
+    ap.add_argument('-o', '--output', help="output file (default: stdout)")
+    args = ap.parse_args(argv)
+
+    query = build_export_query(parse_date(args.since), parse_date(args.until),
+                               args.status, args.doc_type)
+    out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        for chunk in iter_export(query, compress=args.gzip):
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+    if args.output:
+        print(f"✅ Exported to {args.output}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
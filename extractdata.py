@@ -1,10 +1,9 @@
 
-import os
-from main import detect_document_text, parse_text_from_document
+from ocr_backends import detect_document_text
+from example import extract_fields_from_text
 
 # --- Configuration ---
-# Ensure your Google credentials are set
-os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = 'credentials.json'
+# Set VERITO_VISION_API_KEY (or VERITO_VISION_ENDPOINT for the local stand-in in ocr_backends.py)
 # The name of the image file you want to test
 TEST_IMAGE_PATH = "test_pan.jpg"
 
@@ -39,15 +38,15 @@ def run_test():
 
     # 3. Call the parsing function to get structured data
     print("\n--- Step 2: Parsing raw text for specific fields ---")
-    extracted_data = parse_text_from_document(full_text)
+    extracted_data = extract_fields_from_text(full_text)
     print("✅ Parsing complete.")
     
     # 4. Print the final result
     print("\n--- Final Result: Structured Data ---")
-    print(f"  Document Type: {extracted_data.document_type}")
-    print(f"  Name:          {extracted_data.name}")
-    print(f"  Date of Birth: {extracted_data.dob}")
-    print(f"  PAN Number:    {extracted_data.pan_number}")
+    print(f"  Document Type: {extracted_data['doc_type']}")
+    print(f"  Name:          {extracted_data['name_guess']}")
+    print(f"  Date of Birth: {extracted_data['dob']}")
+    print(f"  PAN Number:    {extracted_data['doc_number_candidates']['pan']}")
     print("\n--- Test Finished ---")
 
 
@@ -0,0 +1,94 @@
+"""
+Country lookup for free-text places (place of birth, address, country code).
+
+gazetteer.json maps ISO 3166 alpha-2 countries to their codes, names and
+major cities. Names and cities are loaded once into a token trie and free
+text is matched whole words at a time, longest term first, so "RUSSIA" never
+matches inside "PRUSSIAN" and "NORTH KOREA" wins over a shorter
+"KOREA"-something term. ISO codes are only looked up in country code fields
+(country_of_code): as words in an address they are ordinary abbreviations
+("Sy. No. 45", "KP Agrahara", "IR Colony").
+"""
+
+import json
+import os
+import re
+import threading
+import unicodedata
+
+# ---------- Config ----------
+GAZETTEER_PATH = os.environ.get('VERITO_GAZETTEER',
+                                os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gazetteer.json'))
+
+TOKEN_RE = re.compile(r'[A-Z0-9]+')
+_END = object()  # trie key holding the ISO country of a complete term
+
+_matcher = None
+_matcher_lock = threading.Lock()
+
+def tokens(text):
+    """Upper-case ASCII word tokens; accents are dropped and punctuation splits words."""
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return TOKEN_RE.findall(text.upper())
+
+class Matcher:
+    def __init__(self, entries):
+        """`entries` maps ISO country -> {'codes': [...], 'names': [...], 'cities': [...]}."""
+        self.trie = {}
+        self.codes = {}
+        for iso, terms in entries.items():
+            for code in [iso] + terms.get('codes', []):
+                self.codes[code.upper()] = iso
+            for term in terms.get('names', []) + terms.get('cities', []):
+                node = self.trie
+                for token in tokens(term):
+                    node = node.setdefault(token, {})
+                node[_END] = iso
+
+    def country_of_code(self, code):
+        """ISO country of an alpha-2/alpha-3 code, or None."""
+        return self.codes.get(code.strip().upper()) if code else None
+
+    def countries(self, text):
+        """ISO countries of every country name or city found in `text`, as a set."""
+        found = set()
+        if not text:
+            return found
+        words = tokens(text)
+        i = 0
+        while i < len(words):
+            node, match, j = self.trie, None, i
+            while j < len(words) and words[j] in node:
+                node = node[words[j]]
+                j += 1
+                if _END in node:
+                    match = (node[_END], j)
+            if match:
+                found.add(match[0])
+                i = match[1]
+            else:
+                i += 1
+        return found
+
+def get_matcher():
+    """The matcher for GAZETTEER_PATH, built on first use."""
+    global _matcher
+    if _matcher is None:
+        with _matcher_lock:
+            if _matcher is None:
+                with open(GAZETTEER_PATH, encoding='utf8') as f:
+                    _matcher = Matcher(json.load(f))
+    return _matcher
+
+def country_of_code(code):
+    """ISO country of a country code field ("RU", "RUS"), or None."""
+    return get_matcher().country_of_code(code)
+
+def find_countries(*texts):
+    """ISO countries named in any of the free-text `texts` (None values are skipped)."""
+    matcher = get_matcher()
+    found = set()
+    for text in texts:
+        found |= matcher.countries(text)
+    return found
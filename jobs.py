@@ -0,0 +1,110 @@
+"""
+In-process background job queue for uploads.
+
+A bounded queue feeds a fixed pool of worker threads, so the web request only
+has to save the upload and enqueue it. submit() raises QueueFull instead of
+blocking when the queue is at capacity, letting the caller push back on the
+client (HTTP 503 + Retry-After) rather than piling up work.
+"""
+
+import os
+import queue
+import threading
+import time
+import traceback
+import uuid
+
+# ---------- Config ----------
+JOB_WORKERS = int(os.environ.get('VERITO_JOB_WORKERS', '2'))
+JOB_QUEUE_SIZE = int(os.environ.get('VERITO_JOB_QUEUE_SIZE', '32'))
+JOB_TTL_SECONDS = 3600  # how long finished jobs stay available for polling
+
+
+class QueueFull(Exception):
+    """Raised by JobQueue.submit when no more jobs can be accepted."""
+
+
+class JobQueue:
+    def __init__(self, handler, workers=JOB_WORKERS, max_queued=JOB_QUEUE_SIZE, initializer=None):
+        """
+        `handler(payload)` runs on a worker thread; its return value is the job result.
+        `initializer()` runs once on each worker thread before its first job.
+        """
+        self.handler = handler
+        self.initializer = initializer
+        self.workers = workers
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            t = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def submit(self, payload, **info):
+        """Queue a job and return its id; extra keyword info is echoed in the job status."""
+        self._prune()
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+            **info,
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+        try:
+            self._queue.put_nowait((job_id, payload))
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job_id]
+            raise QueueFull(f"Job queue is full ({self._queue.maxsize} pending)")
+        return job_id
+
+    def get(self, job_id):
+        """Snapshot of a job's state, or None if unknown/expired."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _work(self):
+        if self.initializer:
+            try:
+                self.initializer()
+            except Exception:
+                traceback.print_exc()
+        while True:
+            job_id, payload = self._queue.get()
+            self._update(job_id, status="running", started_at=time.time())
+            try:
+                result = self.handler(payload)
+                self._update(job_id, status="done", result=result, finished_at=time.time())
+            except Exception as e:
+                traceback.print_exc()
+                self._update(job_id, status="failed", error=str(e), finished_at=time.time())
+            finally:
+                self._queue.task_done()
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def _prune(self):
+        cutoff = time.time() - JOB_TTL_SECONDS
+        with self._lock:
+            expired = [jid for jid, j in self._jobs.items()
+                       if j["finished_at"] and j["finished_at"] < cutoff]
+            for jid in expired:
+                del self._jobs[jid]
@@ -0,0 +1,97 @@
+"""
+Layout templates for card types whose field positions are fixed.
+
+Once a card has been cropped and deskewed (cards.py), its fields sit at known
+places. Instead of OCRing the whole card and hunting for values with regexes,
+each template OCRs only its field regions, one line each (--psm 7), with a
+character whitelist per field. A template applies when its key field (the
+document number) reads as a valid number; otherwise the card goes through
+full OCR as before.
+
+Boxes are (left, top, right, bottom) as fractions of the landscape card;
+'chars' is the Tesseract whitelist (None = any) and 'label' prefixes the value
+in the raw text handed on to refinement.
+"""
+
+import os
+import re
+import ocr_engine
+
+# ---------- Config ----------
+LAYOUT_OCR = os.environ.get('VERITO_LAYOUT_OCR', '1') == '1'
+BOX_PADDING = 0.01           # grown on every side, to absorb small crop offsets
+
+UPPER = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+DIGITS = '0123456789'
+
+# ---------- Template registry ----------
+LAYOUTS = [
+    {
+        'name': 'pan',
+        'doc_type': 'PAN',
+        'key': 'doc_number',
+        'pattern': r'[A-Z]{5}[0-9]{4}[A-Z]',
+        'fields': {
+            'doc_number':  {'box': (0.04, 0.28, 0.60, 0.42), 'chars': UPPER + DIGITS, 'label': 'PAN'},
+            'name':        {'box': (0.04, 0.44, 0.80, 0.56), 'chars': UPPER + ' .', 'label': 'Name'},
+            'father_name': {'box': (0.04, 0.58, 0.80, 0.70), 'chars': UPPER + ' .', 'label': "Father's Name"},
+            'dob':         {'box': (0.04, 0.74, 0.50, 0.86), 'chars': DIGITS + '/', 'label': 'Date of Birth'},
+        },
+    },
+    {
+        'name': 'aadhaar_front',
+        'doc_type': 'AADHAAR',
+        'key': 'doc_number',
+        'pattern': r'[2-9][0-9]{11}',
+        'fields': {
+            'doc_number': {'box': (0.22, 0.78, 0.80, 0.93), 'chars': DIGITS + ' ', 'label': 'Aadhaar'},
+            'name':       {'box': (0.28, 0.24, 0.96, 0.36), 'chars': UPPER + UPPER.lower() + ' .',
+                           'label': 'Name'},
+            # Printed with its own "DOB:" / "Year of Birth:" label, so read as is
+            'dob':        {'box': (0.28, 0.36, 0.96, 0.47), 'chars': None, 'label': None},
+        },
+    },
+]
+
+def register(layout):
+    """Add a template; it is tried after the built-in ones."""
+    LAYOUTS.append(layout)
+
+# ---------- OCR ----------
+def crop(img, box):
+    h, w = img.shape[:2]
+    left, top, right, bottom = box
+    x0 = max(0, int((left - BOX_PADDING) * w))
+    y0 = max(0, int((top - BOX_PADDING) * h))
+    x1 = min(w, int((right + BOX_PADDING) * w))
+    y1 = min(h, int((bottom + BOX_PADDING) * h))
+    return img[y0:y1, x0:x1]
+
+def ocr_field(img, field, timeout=0):
+    """Text and word confidences of one field region, read as a single line."""
+    whitelist = field['chars'].replace(' ', '') if field['chars'] else None
+    _, data = ocr_engine.recognize(crop(img, field['box']), psm=7, whitelist=whitelist, timeout=timeout)
+    return ' '.join(w.strip() for w in data['text']), data['conf']
+
+def read_layout(img, timeout=0):
+    """
+    Try each template on a binarized card. Returns (layout, values, confs, key_confs)
+    for the first one whose key field reads as a valid document number, else None;
+    `key_confs` are the word confidences of the key field alone.
+    `timeout` caps each Tesseract call (0 = none).
+    """
+    if not LAYOUT_OCR:
+        return None
+    for layout in LAYOUTS:
+        key_text, key_confs = ocr_field(img, layout['fields'][layout['key']], timeout)
+        key = re.sub(r'\s+', '', key_text).upper()
+        if not re.fullmatch(layout['pattern'], key):
+            continue
+        values, confs = {layout['key']: key}, list(key_confs)
+        for name, field in layout['fields'].items():
+            if name == layout['key']:
+                continue
+            values[name], field_confs = ocr_field(img, field, timeout)
+            confs.extend(field_confs)
+        return layout, values, confs, list(key_confs)
+    return None
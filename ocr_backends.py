@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+OCR backends behind one interface, and a router that spreads pages across them.
+
+Every backend takes a batch of grayscale/binarized uint8 images and returns
+one (text, data) per image, in the ocr_engine shape (data has per-word 'text'
+and 'conf' lists, conf 0-100):
+
+- TesseractBackend: local Tesseract via ocr_engine
+- VisionBackend: Google Cloud Vision DOCUMENT_TEXT_DETECTION over REST, up to
+  16 images per request; the endpoint is configurable, so it can point at the
+  local stand-in below
+
+The Router sends each page to the backend with the lowest expected cost,
+from observed latency (EWMA), requests in flight and mean word confidence.
+
+    python ocr_backends.py --stub-vision 8765   # Vision-compatible stand-in backed by Tesseract
+"""
+
+import argparse
+import base64
+import json
+import os
+import socket
+import threading
+import time
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor, wait
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import cv2
+import numpy as np
+import ocr_engine
+
+# ---------- Config ----------
+# Comma-separated backends the router may use, in order of preference
+OCR_BACKENDS = os.environ.get('VERITO_OCR_BACKENDS', 'tesseract')
+VISION_ENDPOINT = os.environ.get('VERITO_VISION_ENDPOINT', 'https://vision.googleapis.com/v1/images:annotate')
+VISION_API_KEY = os.environ.get('VERITO_VISION_API_KEY')
+VISION_BATCH_SIZE = 16          # Vision's per-request image limit
+VISION_TIMEOUT_SECONDS = 30.0   # used when the caller has no deadline
+LATENCY_ALPHA = 0.2             # EWMA weight of the newest observation
+EXPLORE_EVERY = 50              # every n-th page goes to the least recently used backend
+FAILURE_PENALTY_SECONDS = 30.0  # latency charged to a backend for a failed call
+ROUTER_THREADS = 8              # backend groups of one batch run side by side
+
+# Tesseract language codes -> Vision language hints
+VISION_LANGUAGES = {'eng': 'en', 'hin': 'hi'}
+
+# ---------- backends ----------
+class OCRBackend:
+    name = None
+
+    def recognize_batch(self, images, lang='eng', timeout=0):
+        """[(text, data)] for `images`; `timeout` in seconds for the whole batch (0 = none)."""
+        raise NotImplementedError
+
+    def recognize(self, img, lang='eng', timeout=0):
+        return self.recognize_batch([img], lang=lang, timeout=timeout)[0]
+
+
+class TesseractBackend(OCRBackend):
+    name = 'tesseract'
+
+    def recognize_batch(self, images, lang='eng', timeout=0):
+        start = time.monotonic()
+        out = []
+        for img in images:
+            remaining = timeout - (time.monotonic() - start) if timeout else 0
+            if timeout and remaining <= 0:
+                raise RuntimeError("Tesseract batch timeout")
+            out.append(ocr_engine.recognize(img, lang=lang, timeout=remaining))
+        return out
+
+
+class VisionBackend(OCRBackend):
+    name = 'vision'
+
+    def __init__(self, endpoint=VISION_ENDPOINT, api_key=VISION_API_KEY):
+        self.endpoint = endpoint
+        self.api_key = api_key
+
+    def recognize_batch(self, images, lang='eng', timeout=0):
+        hints = [VISION_LANGUAGES[code] for code in lang.split('+') if code in VISION_LANGUAGES]
+        out = []
+        for i in range(0, len(images), VISION_BATCH_SIZE):
+            requests = [self.build_request(img, hints) for img in images[i:i + VISION_BATCH_SIZE]]
+            body = self.post({'requests': requests}, timeout or VISION_TIMEOUT_SECONDS)
+            for resp in body.get('responses', []):
+                if 'error' in resp:
+                    raise RuntimeError(f"Vision error: {resp['error'].get('message', resp['error'])}")
+                out.append(parse_annotation(resp.get('fullTextAnnotation') or {}))
+        if len(out) != len(images):
+            raise RuntimeError(f"Vision returned {len(out)} results for {len(images)} images")
+        return out
+
+    @staticmethod
+    def build_request(img, hints):
+        ok, png = cv2.imencode('.png', img)
+        if not ok:
+            raise ValueError("Could not encode image")
+        request = {'image': {'content': base64.b64encode(png.tobytes()).decode('ascii')},
+                   'features': [{'type': 'DOCUMENT_TEXT_DETECTION'}]}
+        if hints:
+            request['imageContext'] = {'languageHints': hints}
+        return request
+
+    def post(self, payload, timeout):
+        headers = {'Content-Type': 'application/json'}
+        if self.api_key:
+            headers['x-goog-api-key'] = self.api_key
+        req = urllib.request.Request(self.endpoint, data=json.dumps(payload).encode('utf8'),
+                                     headers=headers, method='POST')
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                return json.load(resp)
+        except (socket.timeout, TimeoutError) as e:
+            raise RuntimeError("Vision request timeout") from e
+        except urllib.error.URLError as e:
+            if isinstance(e.reason, (socket.timeout, TimeoutError)):
+                raise RuntimeError("Vision request timeout") from e
+            raise RuntimeError(f"Vision request failed: {e}") from e
+
+
+def parse_annotation(annotation):
+    """(text, data) from a Vision fullTextAnnotation."""
+    words, confs = [], []
+    for page in annotation.get('pages', []):
+        for block in page.get('blocks', []):
+            for paragraph in block.get('paragraphs', []):
+                for word in paragraph.get('words', []):
+                    words.append(''.join(s.get('text', '') for s in word.get('symbols', [])))
+                    confs.append(int(round(word.get('confidence', 0) * 100)))
+    return annotation.get('text', ''), {'text': words, 'conf': confs}
+
+
+BACKENDS = {'tesseract': TesseractBackend, 'vision': VisionBackend}
+
+# ---------- routing ----------
+class Router:
+    """
+    Sends each page to the backend with the lowest expected cost:
+    latency EWMA x (1 + pages in flight) / mean confidence. Backends not yet
+    measured are tried first, and every EXPLORE_EVERY-th page goes to the least
+    recently used one so a backend that recovered gets noticed. A failed call
+    is charged FAILURE_PENALTY_SECONDS and the page moves on to the next backend.
+    """
+    def __init__(self, backends):
+        self.backends = {b.name: b for b in backends}
+        self._lock = threading.Lock()
+        self._picks = 0
+        self.stats = {name: {'latency': None, 'conf': None, 'inflight': 0,
+                             'pages': 0, 'errors': 0, 'last_used': 0.0}
+                      for name in self.backends}
+
+    def cost(self, name):
+        s = self.stats[name]
+        if s['latency'] is None:
+            return 0.0
+        return s['latency'] * (1 + s['inflight']) / max(s['conf'] or 0.0, 0.05)
+
+    def ranked(self):
+        """Backend names, best first (callers hold the lock)."""
+        self._picks += 1
+        if self._picks % EXPLORE_EVERY == 0:
+            return sorted(self.backends, key=lambda n: self.stats[n]['last_used'])
+        return sorted(self.backends, key=self.cost)
+
+    def recognize_batch(self, images, lang='eng', timeout=0):
+        """
+        Route every image on its own; pages sent to the same backend go as one
+        batch, and the batches of different backends run concurrently.
+        """
+        with self._lock:
+            plan = {}
+            for i in range(len(images)):
+                name = self.ranked()[0]
+                self.stats[name]['inflight'] += 1
+                plan.setdefault(name, []).append(i)
+        groups = [(name, indices, [images[i] for i in indices]) for name, indices in plan.items()]
+        if len(groups) == 1:
+            name, _, group = groups[0]
+            results = [self._run(name, group, lang, timeout)]
+        else:
+            # Every group runs to the end, releasing its in-flight count, even
+            # when another one fails; the first failure is raised afterwards
+            futures = [_group_pool().submit(self._run, name, group, lang, timeout)
+                       for name, _, group in groups]
+            wait(futures)
+            results = [f.result() for f in futures]
+        out = [None] * len(images)
+        for (_, indices, _), group_results in zip(groups, results):
+            for i, result in zip(indices, group_results):
+                out[i] = result
+        return out
+
+    def recognize(self, img, lang='eng', timeout=0):
+        return self.recognize_batch([img], lang=lang, timeout=timeout)[0]
+
+    def _run(self, name, images, lang, timeout):
+        """
+        OCR one group on `name`, whose in-flight count the caller reserved.
+        Every reservation is released by exactly one _observe, success or failure.
+        """
+        tried = [name]
+        while True:
+            start = time.monotonic()
+            try:
+                results = self.backends[name].recognize_batch(images, lang=lang, timeout=timeout)
+                per_page = (time.monotonic() - start) / max(len(images), 1)
+                confs = [c for _, data in results for c in data['conf']]
+            except Exception as e:
+                with self._lock:
+                    self._observe(name, len(images), FAILURE_PENALTY_SECONDS, None, error=True)
+                    fallback = [n for n in self.ranked() if n not in tried]
+                    if 'timeout' in str(e).lower() or not fallback:
+                        raise
+                    name = fallback[0]
+                    self.stats[name]['inflight'] += len(images)
+                tried.append(name)
+                print(f"⚠️  OCR backend {tried[-2]} failed ({e}); retrying on {name}")
+                continue
+            with self._lock:
+                self._observe(name, len(images), per_page, sum(confs) / len(confs) / 100.0 if confs else None)
+            return results
+
+    def _observe(self, name, pages, latency, conf, error=False):
+        s = self.stats[name]
+        s['inflight'] -= pages
+        s['pages'] += pages
+        s['errors'] += error
+        s['last_used'] = time.monotonic()
+        s['latency'] = latency if s['latency'] is None else \
+            (1 - LATENCY_ALPHA) * s['latency'] + LATENCY_ALPHA * latency
+        if conf is not None:
+            s['conf'] = conf if s['conf'] is None else (1 - LATENCY_ALPHA) * s['conf'] + LATENCY_ALPHA * conf
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(s) for name, s in self.stats.items()}
+
+
+_router = None
+_router_lock = threading.Lock()
+_pool = None
+
+def _group_pool():
+    global _pool
+    if _pool is None:
+        with _router_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=ROUTER_THREADS, thread_name_prefix='ocr-router')
+    return _pool
+
+def get_router():
+    """The process-wide router over the backends named in VERITO_OCR_BACKENDS."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                names = [n.strip() for n in OCR_BACKENDS.split(',') if n.strip()]
+                _router = Router([BACKENDS[n]() for n in names])
+    return _router
+
+# ---------- Vision stand-in ----------
+def detect_document_text(content):
+    """Full text of an encoded image (PNG/JPG bytes) via Cloud Vision."""
+    img = cv2.imdecode(np.frombuffer(content, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        raise ValueError("Could not decode image")
+    return VisionBackend().recognize(img)[0]
+
+
+class VisionStubHandler(BaseHTTPRequestHandler):
+    """Answers images:annotate requests with Tesseract output in Vision's response shape."""
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        responses = []
+        for request in body.get('requests', []):
+            data = base64.b64decode(request['image']['content'])
+            img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+            if img is None:
+                responses.append({'error': {'code': 3, 'message': 'Bad image data.'}})
+                continue
+            text, ocr_data = ocr_engine.recognize(img)
+            words = [{'symbols': [{'text': ch} for ch in word], 'confidence': conf / 100.0}
+                     for word, conf in zip(ocr_data['text'], ocr_data['conf'])]
+            responses.append({'fullTextAnnotation': {
+                'text': text,
+                'pages': [{'blocks': [{'paragraphs': [{'words': words}]}]}],
+            }})
+        payload = json.dumps({'responses': responses}).encode('utf8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Local Cloud Vision stand-in for testing the Vision backend.")
+    ap.add_argument('--stub-vision', type=int, metavar='PORT', required=True)
+    args = ap.parse_args(argv)
+    server = ThreadingHTTPServer(('127.0.0.1', args.stub_vision), VisionStubHandler)
+    print(f"Vision stand-in on http://127.0.0.1:{args.stub_vision}/v1/images:annotate")
+    server.serve_forever()
+
+if __name__ == '__main__':
+    main()
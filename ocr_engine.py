@@ -0,0 +1,158 @@
+"""
+Tesseract behind one call: recognize(img) -> (text, data).
+
+With tesserocr installed, each thread keeps its own long-lived, initialized
+Tesseract instance per language and hands it the image buffer directly, so a
+page costs one recognition instead of temp files, a forked `tesseract` and a
+language-data reload per call. Without it, pytesseract is used, with a single
+image_to_data run per page (text is rebuilt from its word boxes).
+
+Both return the same shape: the page text, one line per Tesseract line, and
+`data` with per-word 'text' and 'conf' lists like pytesseract's Output.DICT.
+"""
+
+import os
+import threading
+import numpy as np
+import pytesseract
+
+# Optional: tesserocr binds the Tesseract C++ API in-process
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+# ---------- Config ----------
+# auto: tesserocr when installed, else pytesseract
+OCR_ENGINE = os.environ.get('VERITO_OCR_ENGINE', 'auto')
+TESSDATA_PATH = os.environ.get('VERITO_TESSDATA')  # None = Tesseract's default
+DEFAULT_PSM = 3  # fully automatic page segmentation, Tesseract's own default
+
+_local = threading.local()
+_languages = None
+
+def use_tesserocr():
+    if OCR_ENGINE == 'pytesseract':
+        return False
+    if OCR_ENGINE == 'tesserocr' and tesserocr is None:
+        raise RuntimeError("VERITO_OCR_ENGINE=tesserocr but tesserocr is not installed")
+    return tesserocr is not None
+
+def get_api(lang):
+    """This thread's Tesseract instance for `lang`, created on first use."""
+    apis = getattr(_local, 'apis', None)
+    if apis is None:
+        apis = _local.apis = {}
+    if lang not in apis:
+        kwargs = {'lang': lang}
+        if TESSDATA_PATH:
+            kwargs['path'] = TESSDATA_PATH
+        apis[lang] = tesserocr.PyTessBaseAPI(**kwargs)
+    return apis[lang]
+
+def recognize(img, lang='eng', psm=None, whitelist=None, timeout=0):
+    """
+    OCR a grayscale or binarized uint8 image. `psm` is the page segmentation
+    mode, `whitelist` restricts the characters, `timeout` is in seconds (0 = none).
+    A timed-out call raises RuntimeError mentioning "timeout", as pytesseract does.
+    """
+    if use_tesserocr():
+        return _recognize_tesserocr(img, lang, psm or DEFAULT_PSM, whitelist, timeout)
+    return _recognize_pytesseract(img, lang, psm, whitelist, timeout)
+
+def _recognize_tesserocr(img, lang, psm, whitelist, timeout):
+    api = get_api(lang)
+    img = np.ascontiguousarray(img)
+    height, width = img.shape[:2]
+    try:
+        api.SetPageSegMode(psm)
+        api.SetVariable('tessedit_char_whitelist', whitelist or '')
+        api.SetImageBytes(img.tobytes(), width, height, 1, width)
+        if not api.Recognize(timeout=int(timeout * 1000)) and timeout:
+            raise RuntimeError("Tesseract process timeout")
+        text = api.GetUTF8Text()
+        words = api.MapWordConfidences()
+    finally:
+        api.Clear()
+    data = {'text': [w for w, _ in words], 'conf': [int(c) for _, c in words]}
+    return text, data
+
+def _recognize_pytesseract(img, lang, psm, whitelist, timeout):
+    config = f'--psm {psm}' if psm else ''
+    if whitelist:
+        config += f' -c tessedit_char_whitelist={whitelist}'
+    raw = pytesseract.image_to_data(img, lang=lang, config=config.strip(),
+                                    output_type=pytesseract.Output.DICT, timeout=timeout)
+    lines, words, confs = {}, [], []
+    for i, word in enumerate(raw['text']):
+        try:
+            conf = int(float(raw['conf'][i]))
+        except (ValueError, TypeError):
+            continue
+        if conf == -1 or not word.strip():
+            continue
+        key = (raw['block_num'][i], raw['par_num'][i], raw['line_num'][i])
+        lines.setdefault(key, []).append(word)
+        words.append(word)
+        confs.append(conf)
+    text = '\n'.join(' '.join(line) for line in lines.values())
+    return text, {'text': words, 'conf': confs}
+
+def installed_languages():
+    """Language packs (traineddata) Tesseract has installed, read once per process."""
+    global _languages
+    if _languages is None:
+        try:
+            if use_tesserocr():
+                langs = tesserocr.get_languages(TESSDATA_PATH)[1] if TESSDATA_PATH else tesserocr.get_languages()[1]
+            else:
+                config = f'--tessdata-dir "{TESSDATA_PATH}"' if TESSDATA_PATH else ''
+                langs = pytesseract.get_languages(config=config)
+        except Exception as e:
+            print(f"⚠️  Could not list Tesseract languages: {e}")
+            langs = []
+        _languages = frozenset(langs)
+    return _languages
+
+def usable_lang(lang, fallback='eng'):
+    """`lang` ('eng+hin') without the packs that aren't installed; `fallback` if none is left."""
+    installed = installed_languages()
+    usable = [code for code in lang.split('+') if code in installed]
+    return '+'.join(usable) or fallback
+
+def detect_orientation(img, timeout=0):
+    """
+    Tesseract OSD on an image: {'rotate', 'orientation_conf', 'script', 'script_conf'},
+    where 'rotate' is the clockwise rotation in degrees that uprights the text.
+    None when there is too little text to tell.
+    """
+    if use_tesserocr():
+        api = get_api('osd')
+        img = np.ascontiguousarray(img)
+        height, width = img.shape[:2]
+        try:
+            api.SetPageSegMode(tesserocr.PSM.OSD_ONLY)
+            api.SetImageBytes(img.tobytes(), width, height, 1, width)
+            osd = api.DetectOrientationScript()
+        finally:
+            api.Clear()
+        if not osd:
+            return None
+        return {'rotate': (360 - osd['orient_deg']) % 360, 'orientation_conf': osd['orient_conf'],
+                'script': osd['script_name'], 'script_conf': osd['script_conf']}
+    try:
+        osd = pytesseract.image_to_osd(img, output_type=pytesseract.Output.DICT, timeout=timeout)
+    except pytesseract.TesseractError:
+        return None  # "Too few characters", etc.
+    return {key: osd[key] for key in ('rotate', 'orientation_conf', 'script', 'script_conf')}
+
+def warm_up(langs=('eng',)):
+    """
+    List the installed languages and initialize this thread's instances for
+    those of `langs` that are installed (instances only exist with tesserocr).
+    """
+    installed = installed_languages()
+    if use_tesserocr():
+        for lang in dict.fromkeys(lang if lang == 'osd' else usable_lang(lang) for lang in langs):
+            if lang in installed or '+' in lang:
+                get_api(lang)
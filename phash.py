@@ -0,0 +1,98 @@
+"""
+Perceptual hashes of scanned pages/cards and near-duplicate lookup.
+
+A 64-bit DCT hash (pHash) changes little when the same card is re-scanned,
+re-compressed or lightly edited, so a small Hamming distance between two
+hashes means "the same picture". Stored hashes are indexed for multi-index
+hashing: each hash is cut into 4 chunks of 16 bits, each chunk is an entry
+of a multikey index, and a query looks up every chunk value within 1 bit of
+its own. By pigeonhole every stored hash within MAX_DISTANCE (<= 7) bits
+shares at least one such chunk, so a lookup reads only the candidates behind
+68 index keys instead of every stored page.
+"""
+
+import os
+from datetime import datetime, timezone
+from pymongo import ASCENDING
+import dbintegration
+
+# ---------- Config ----------
+PHASH_COLLECTION = 'page_hashes'
+MAX_DISTANCE = int(os.environ.get('VERITO_PHASH_MAX_DISTANCE', '6'))  # bits, at most 7
+CHUNKS = 4
+CHUNK_BITS = 16
+
+_indexes_ready = False
+
+
+def page_hash(gray):
+    """pHash of a grayscale page as 16 hex digits: DCT of a 32x32 copy, 8x8 low frequencies vs their median."""
+    import cv2  # imported here so importing this module (e.g. from refine) stays cheap
+    import numpy as np
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].flatten()
+    median = np.median(low[1:])  # the DC term only carries overall brightness
+    bits = 0
+    for coeff in low:
+        bits = (bits << 1) | int(coeff > median)
+    return f'{bits:016x}'
+
+def hamming(a, b):
+    return bin(int(a, 16) ^ int(b, 16)).count('1')
+
+def chunks(h):
+    """Index entries of a hash: 'position:chunk' for each 16-bit chunk."""
+    value = int(h, 16)
+    mask = (1 << CHUNK_BITS) - 1
+    return [f'{i}:{(value >> (i * CHUNK_BITS)) & mask:04x}' for i in range(CHUNKS)]
+
+def lookup_chunks(h):
+    """Every chunk entry within 1 bit of the hash's own chunks."""
+    value = int(h, 16)
+    mask = (1 << CHUNK_BITS) - 1
+    keys = []
+    for i in range(CHUNKS):
+        chunk = (value >> (i * CHUNK_BITS)) & mask
+        keys.append(f'{i}:{chunk:04x}')
+        keys.extend(f'{i}:{chunk ^ (1 << b):04x}' for b in range(CHUNK_BITS))
+    return keys
+
+# ---------- storage ----------
+def hashes_collection():
+    return dbintegration.get_db()[PHASH_COLLECTION]
+
+def ensure_indexes():
+    global _indexes_ready
+    if _indexes_ready:
+        return
+    hashes_collection().create_index([('chunks', ASCENDING)], name='chunks')
+    _indexes_ready = True
+
+def find_near(h, max_distance=MAX_DISTANCE):
+    """Stored pages within max_distance bits of `h`, closest first, each with its 'distance'."""
+    ensure_indexes()
+    # Every candidate is compared: a cap could drop the one true match. A random
+    # hash shares a probed chunk with ~0.1% of stored pages, and only the
+    # 16-digit hash and ids come back
+    near = []
+    cursor = hashes_collection().find({'chunks': {'$in': lookup_chunks(h)}},
+                                      {'hash': 1, 'doc_id': 1, 'doc_type': 1, 'page': 1, 'card': 1})
+    for rec in cursor:
+        distance = hamming(h, rec['hash'])
+        if distance <= max_distance:
+            rec['distance'] = distance
+            near.append(rec)
+    return sorted(near, key=lambda r: r['distance'])
+
+def register(h, doc_id, doc_type, page=None, card=None):
+    """Remember the hash of a stored document's page."""
+    ensure_indexes()
+    hashes_collection().insert_one({
+        'hash': h,
+        'chunks': chunks(h),
+        'doc_id': doc_id,
+        'doc_type': doc_type,
+        'page': page,
+        'card': card,
+        'created_at': datetime.now(timezone.utc),
+    })
@@ -0,0 +1,205 @@
+"""
+OCR -> refine -> validate -> store pipeline for one uploaded file.
+Shared by the web app, its background jobs and the standalone queue workers.
+Stages hand Python objects to each other directly, so concurrent runs in
+one process don't share any files.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from deadline import Deadline, DeadlineExceeded
+
+# ---------- Config ----------
+# Files of one upload processed concurrently (1 = one after another). Threads
+# are enough: Tesseract runs as a subprocess, OpenCV releases the GIL and the
+# Gemini calls are network-bound.
+FILE_WORKERS = int(os.environ.get('VERITO_FILE_WORKERS', '4'))
+# Extra wait for a file past its own deadline before giving up on its thread
+DEADLINE_GRACE_SECONDS = float(os.environ.get('VERITO_DEADLINE_GRACE_SECONDS', '5'))
+# Stages whose partial output is raw OCR entries rather than refined results
+OCR_STAGES = ('rasterize', 'preprocess', 'ocr')
+
+_file_pool = None
+
+# ---------- lazy stage modules ----------
+# The OCR stack (OpenCV, Tesseract, poppler) and the Gemini SDK are only
+# imported when a document is actually processed, so the web tier can boot
+# and serve the dashboard without them.
+def ocr():
+    import example
+    return example
+
+def refiner():
+    import refine
+    return refine
+
+def warm_ocr_thread():
+    """
+    Initialize the calling thread's Tesseract instances (they are per thread
+    with tesserocr): OSD and every language set pages can be read with.
+    Used as the initializer of every thread that runs OCR.
+    """
+    try:
+        example = ocr()
+        import ocr_engine
+        ocr_engine.warm_up((example.DEFAULT_LANG, 'osd', example.MULTI_LANG, *example.SCRIPT_LANGS.values()))
+    except Exception as e:
+        # The thread still works; its first page just pays for the setup
+        print(f"⚠️  OCR warm-up failed: {e}")
+
+def get_file_pool():
+    global _file_pool
+    if _file_pool is None:
+        _file_pool = ThreadPoolExecutor(max_workers=FILE_WORKERS, thread_name_prefix='file',
+                                        initializer=warm_ocr_thread)
+    return _file_pool
+
+def summarize(results, cumulative):
+    """Summary verdict in the shape the UI and job APIs return."""
+    name = results[-1]["document"].get("first_name") if results else None
+    return {
+        "flags": cumulative["flags"],
+        "risk_score": cumulative["risk_score"],
+        "status": cumulative["status"],
+        "name": name,
+        "timed_out_at": cumulative.get("timed_out_at"),
+    }
+
+def ocr_upload(data, filename, deadline=None):
+    """OCR stage only; a top-level function so it can run in a process pool."""
+    return ocr().process_document(data, filename, deadline=deadline)
+
+def verify_upload(data, filename, deadline=None, client_ip=None):
+    """
+    OCR, refine, validate and store one upload held in memory; returns (results, cumulative).
+    `client_ip` is the uploader's address, for the blacklist rule (None for local files).
+    Runs under a per-document deadline (deadline.DOCUMENT_DEADLINE_SECONDS by default);
+    if it runs out, the work finished so far is returned flagged as timed out.
+    """
+    deadline = deadline or Deadline()
+    try:
+        entries = ocr_upload(data, filename, deadline)
+        return refiner().refine_entries(entries, deadline=deadline, client_ip=client_ip)
+    except DeadlineExceeded as e:
+        print(f"⏱️  {filename}: {e}")
+        return timed_out(e)
+
+def timed_out(exc):
+    """(results, cumulative) for the partial work carried by a DeadlineExceeded."""
+    if exc.stage in OCR_STAGES:
+        # Pages that were read but never refined: keep them, but not in the verdict
+        results = [{"document": entry,
+                    "validation": {"status": "TIMEOUT", "flags": ["Not refined before the deadline"]}}
+                   for entry in exc.partial]
+    else:
+        results = list(exc.partial)
+    cumulative = refiner().summarize_results(results)
+    cumulative["timed_out_at"] = exc.stage
+    cumulative["flags"].append(str(exc))
+    if cumulative["status"] == "PASS":
+        cumulative["status"] = "ESCALATE"
+    return results, cumulative
+
+def run_upload(data, filename, client_ip=None):
+    """Process one upload held in memory and return its summary verdict."""
+    return summarize(*verify_upload(data, filename, client_ip=client_ip))
+
+def run_file(input_path):
+    """Process one saved file and return its summary verdict."""
+    with open(input_path, 'rb') as f:
+        return run_upload(f.read(), os.path.basename(input_path))
+
+def run_files(uploads, client_ip=None):
+    """
+    Process several uploads concurrently, e.g. a passport + PAN + Aadhaar bundle,
+    so the whole bundle takes about as long as its slowest file.
+
+    `uploads` is a list of (filename, data). Returns (per_file, combined):
+    a summary per file in upload order, and one verdict over every document of
+    every file, including the cross-document name consistency rule.
+    `client_ip` is the address the bundle was uploaded from.
+    """
+    pool = get_file_pool()
+    futures = []
+    for name, data in uploads:
+        # Each file gets its own budget, counted from when the upload arrived
+        deadline = Deadline()
+        futures.append((name, deadline, pool.submit(verify_upload, data, name, deadline, client_ip)))
+
+    outcomes = []
+    for name, deadline, future in futures:
+        remaining = deadline.remaining()
+        try:
+            wait = None if remaining is None else max(remaining, 0) + DEADLINE_GRACE_SECONDS
+            outcomes.append((name, future.result(timeout=wait)))
+        except FutureTimeout:
+            # Stops it if it never started; a running file gives up at its next check
+            future.cancel()
+            outcomes.append((name, timed_out(DeadlineExceeded('queued' if future.cancelled() else 'running'))))
+        except Exception as e:
+            outcomes.append((name, e))
+    return aggregate(outcomes)
+
+def aggregate(outcomes):
+    """
+    Per-file summaries and a combined verdict from (filename, outcome) pairs,
+    where an outcome is (results, cumulative) or the exception the file raised.
+    """
+    per_file = []
+    all_results = []
+    for name, outcome in outcomes:
+        if isinstance(outcome, Exception):
+            print(f"❌ Error processing {name}: {outcome}")
+            per_file.append({"filename": name, "flags": [f"Processing failed: {outcome}"],
+                             "risk_score": None, "status": "ERROR", "name": None})
+            continue
+        results, cumulative = outcome
+        per_file.append({"filename": name, **summarize(results, cumulative)})
+        all_results.extend(results)
+
+    cumulative = refiner().summarize_results(all_results)
+    failed = [f["filename"] for f in per_file if f["status"] == "ERROR"]
+    if failed:
+        # A bundle with an unprocessed file can't pass on the remaining ones alone
+        cumulative["flags"].append(f"Could not process: {', '.join(failed)}")
+        if cumulative["status"] == "PASS":
+            cumulative["status"] = "ESCALATE"
+    late = [f["filename"] for f in per_file if f.get("timed_out_at")]
+    if late:
+        cumulative["flags"].append(f"Timed out: {', '.join(late)}")
+        if cumulative["status"] == "PASS":
+            cumulative["status"] = "ESCALATE"
+    combined = summarize(all_results, cumulative)
+    return per_file, combined
+
+def warm_up(ocr_stack=True):
+    """
+    Pre-initialize the heavy modules and clients so the first request doesn't pay
+    for them. Call it in each worker after the fork (clients aren't fork-safe).
+    With the OCR stack, every file pool thread is started too, so each one has
+    run its initializer (warm_ocr_thread) before the first upload arrives.
+    """
+    import dbintegration
+    dbintegration.get_client()
+    if ocr_stack:
+        warm_ocr_thread()
+        refiner().get_client()
+        start_file_pool()
+
+def start_file_pool(timeout=120):
+    """
+    Spawn all FILE_WORKERS threads now: the executor only starts a thread when a
+    task finds none idle, so FILE_WORKERS tasks wait on each other until each
+    has its own thread (and that thread's initializer has finished).
+    """
+    barrier = threading.Barrier(FILE_WORKERS)
+    def wait():
+        try:
+            barrier.wait(timeout)
+        except threading.BrokenBarrierError:
+            pass
+    pool = get_file_pool()
+    for future in [pool.submit(wait) for _ in range(FILE_WORKERS)]:
+        future.result()
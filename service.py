@@ -0,0 +1,114 @@
+"""
+Async ingestion API, served alongside the Flask UI:
+
+    uvicorn service:app --host 0.0.0.0 --port 8000
+
+One event loop keeps many verifications in flight at once. Uploads are read
+in chunks, CPU-bound OCR runs in a process pool, Gemini calls use the SDK's
+async client, and blocking MongoDB work runs on threads. The stages are the
+same example/refine/dbintegration code the Flask app uses, via pipeline.py.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from typing import List
+
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile
+from werkzeug.utils import secure_filename
+
+import pipeline
+from deadline import Deadline, DeadlineExceeded
+
+# ---------- Config ----------
+OCR_PROCESSES = int(os.environ.get('VERITO_OCR_PROCESSES', str(os.cpu_count() or 2)))
+LLM_CONCURRENCY = int(os.environ.get('VERITO_LLM_CONCURRENCY', '16'))  # Gemini calls in flight
+MAX_UPLOAD_BYTES = 20 * 1024 * 1024
+CHUNK_BYTES = 1024 * 1024
+ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg'}
+
+_ocr_pool = None
+_llm_slots = None
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global _ocr_pool, _llm_slots
+    # forkserver: forking this process (event loop threads, MongoDB and Gemini
+    # clients) could hand a worker a lock held by a thread that doesn't exist there
+    _ocr_pool = ProcessPoolExecutor(max_workers=OCR_PROCESSES,
+                                    mp_context=multiprocessing.get_context('forkserver'))
+    _llm_slots = asyncio.Semaphore(LLM_CONCURRENCY)
+    try:
+        yield
+    finally:
+        _ocr_pool.shutdown(cancel_futures=True)
+
+
+app = FastAPI(title="VERITO ingestion", lifespan=lifespan)
+
+
+async def read_upload(file: UploadFile):
+    """Read an upload chunk by chunk, refusing anything over MAX_UPLOAD_BYTES."""
+    buf = bytearray()
+    while chunk := await file.read(CHUNK_BYTES):
+        buf += chunk
+        if len(buf) > MAX_UPLOAD_BYTES:
+            raise HTTPException(413, f"{file.filename} exceeds {MAX_UPLOAD_BYTES} bytes")
+    return bytes(buf)
+
+
+async def refine_entry(entry, deadline, client_ip=None):
+    refine = pipeline.refiner()
+    # Local hard-fail rules first; a rejected entry never takes an LLM slot
+    screened = await asyncio.to_thread(refine.screen_entry, entry, deadline)
+    if screened is not None:
+        return screened
+    async with _llm_slots:
+        cleaned = await refine.refine_with_gemini_async(entry, deadline)
+    # Validation is cheap; fin/insert block on MongoDB. The client IP only feeds
+    # the blacklist rule: it is neither sent to Gemini nor stored
+    return await asyncio.to_thread(refine.finalize_entry, entry, cleaned, deadline, client_ip)
+
+
+async def verify_upload(data, filename, client_ip=None):
+    """Async counterpart of pipeline.verify_upload; returns (results, cumulative)."""
+    deadline = Deadline()
+    loop = asyncio.get_running_loop()
+    try:
+        entries = await loop.run_in_executor(_ocr_pool, pipeline.ocr_upload, data, filename, deadline)
+    except DeadlineExceeded as e:
+        return pipeline.timed_out(e)
+    outcomes = await asyncio.gather(*(refine_entry(e, deadline, client_ip) for e in entries), return_exceptions=True)
+    results = [o for o in outcomes if not isinstance(o, BaseException)]
+    for outcome in outcomes:
+        if isinstance(outcome, DeadlineExceeded):
+            return pipeline.timed_out(DeadlineExceeded(outcome.stage, partial=results))
+        if isinstance(outcome, BaseException):
+            raise outcome
+    return results, pipeline.refiner().summarize_results(results)
+
+
+@app.post("/verify")
+async def verify(request: Request, files: List[UploadFile] = File(...)):
+    """Verify one or more documents; returns a verdict per file and a combined one."""
+    uploads = []
+    for file in files:
+        filename = secure_filename(file.filename or '')
+        if '.' not in filename or filename.rsplit('.', 1)[1].lower() not in ALLOWED_EXTENSIONS:
+            raise HTTPException(400, f"Unsupported file: {file.filename}")
+        uploads.append((filename, await read_upload(file)))
+
+    client_ip = request.client.host if request.client else None
+    outcomes = await asyncio.gather(*(verify_upload(data, name, client_ip) for name, data in uploads),
+                                    return_exceptions=True)
+    per_file, combined = pipeline.aggregate([(name, outcome) for (name, _), outcome in zip(uploads, outcomes)])
+    return {"files": per_file, "combined": combined}
+
+
+@app.get("/health")
+async def health():
+    refine = pipeline.refiner()
+    return {"status": "ok", "prescreen": refine.prescreen_stats(), "blacklist": refine.blacklist.stats()}
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Standalone pipeline worker for the MongoDB work queue (see workqueue.py).
+
+    python worker.py --concurrency 4
+
+Run as many of these as needed, on any machine that can reach MongoDB; each
+job is claimed by exactly one worker at a time. Jobs of a crashed worker are
+picked up again once their lease expires.
+"""
+
+import argparse
+import os
+import signal
+import socket
+import threading
+import traceback
+import uuid
+import pipeline
+import workqueue
+
+# ---------- Config ----------
+POLL_INTERVAL_SECONDS = 2.0
+
+def process_job(job):
+    """Run the pipeline on the job's upload straight from GridFS."""
+    return pipeline.run_upload(workqueue.load_upload(job), job['filename'], job.get('client_ip'))
+
+def keep_alive(job, worker_id, done):
+    while not done.wait(workqueue.HEARTBEAT_SECONDS):
+        if not workqueue.heartbeat(job['_id'], worker_id):
+            print(f"⚠️  {worker_id}: lost lease on job {job['_id']}")
+            return
+
+def run_worker(worker_id, stop):
+    print(f"🔹 {worker_id} started")
+    pipeline.warm_ocr_thread()  # this thread's Tesseract instances
+    while not stop.is_set():
+        try:
+            workqueue.dead_letter_expired()
+            job = workqueue.claim(worker_id)
+        except Exception as e:
+            print(f"⚠️  {worker_id}: queue unavailable: {e}")
+            stop.wait(POLL_INTERVAL_SECONDS)
+            continue
+        if job is None:
+            stop.wait(POLL_INTERVAL_SECONDS)
+            continue
+
+        print(f"🔹 {worker_id}: job {job['_id']} ({job['filename']}), attempt {job['attempts']}/{job['max_attempts']}")
+        done = threading.Event()
+        threading.Thread(target=keep_alive, args=(job, worker_id, done), daemon=True).start()
+        try:
+            result = process_job(job)
+            workqueue.complete(job, worker_id, result)
+            print(f"✅ {worker_id}: job {job['_id']} -> {result['status']}")
+        except Exception as e:
+            traceback.print_exc()
+            workqueue.fail(job, worker_id, str(e))
+        finally:
+            done.set()
+    print(f"🔹 {worker_id} stopped")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Run pipeline jobs from the MongoDB work queue.")
+    ap.add_argument('--concurrency', type=int, default=1, help="jobs processed in parallel by this process")
+    args = ap.parse_args(argv)
+
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+
+    base = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+    threads = [threading.Thread(target=run_worker, args=(f"{base}/{i}", stop))
+               for i in range(args.concurrency)]
+    for t in threads:
+        t.start()
+    while any(t.is_alive() for t in threads):
+        for t in threads:
+            t.join(timeout=1.0)
+
+if __name__ == '__main__':
+    main()
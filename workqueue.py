@@ -0,0 +1,170 @@
+"""
+Durable MongoDB work queue for running the pipeline on several machines.
+
+Jobs live in the `pipeline_jobs` collection of the document_verification
+database and their uploads in the `uploads` GridFS bucket. A worker claims a
+job atomically and holds a lease on it that it renews with heartbeats; if the
+worker dies the lease runs out and another worker picks the job up again.
+Failed jobs are retried with backoff until `max_attempts`, then dead-lettered
+(status "dead") for manual inspection.
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+import gridfs
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+import dbintegration
+from jobs import QueueFull
+
+# ---------- Config ----------
+LEASE_SECONDS = int(os.environ.get('VERITO_LEASE_SECONDS', '120'))  # visibility timeout
+HEARTBEAT_SECONDS = LEASE_SECONDS // 4
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 30
+MAX_PENDING = int(os.environ.get('VERITO_MAX_PENDING_JOBS', '1000'))
+
+JOBS_COLLECTION = 'pipeline_jobs'
+UPLOADS_BUCKET = 'uploads'
+
+_indexes_ready = False
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+def jobs_collection():
+    return dbintegration.get_db()[JOBS_COLLECTION]
+
+def uploads_fs():
+    return gridfs.GridFS(dbintegration.get_db(), collection=UPLOADS_BUCKET)
+
+def ensure_indexes():
+    global _indexes_ready
+    if _indexes_ready:
+        return
+    jobs_collection().create_index([('status', ASCENDING), ('available_at', ASCENDING)], name='claim_queued')
+    jobs_collection().create_index([('status', ASCENDING), ('lease_expires_at', ASCENDING)], name='claim_expired')
+    _indexes_ready = True
+
+# ---------- producer side ----------
+def enqueue(filename, data, max_attempts=MAX_ATTEMPTS, client_ip=None):
+    """
+    Store the upload and queue a job for it; returns the job id. `client_ip`
+    (the uploader's address) stays on the job, for the worker's blacklist check.
+    """
+    ensure_indexes()
+    if jobs_collection().count_documents({'status': 'queued'}, limit=MAX_PENDING) >= MAX_PENDING:
+        raise QueueFull(f"Work queue is full ({MAX_PENDING} pending)")
+    file_id = uploads_fs().put(data, filename=filename)
+    now = _now()
+    return jobs_collection().insert_one({
+        'status': 'queued',
+        'filename': filename,
+        'file_id': file_id,
+        'client_ip': client_ip,
+        'attempts': 0,
+        'max_attempts': max_attempts,
+        'created_at': now,
+        'available_at': now,
+        'lease_expires_at': None,
+        'worker': None,
+        'result': None,
+        'error': None,
+    }).inserted_id
+
+def get_job(job_id):
+    """Job state as a JSON-friendly dict, or None if unknown."""
+    if not ObjectId.is_valid(job_id):
+        return None
+    job = jobs_collection().find_one({'_id': ObjectId(job_id)})
+    if job is None:
+        return None
+    return {
+        'job_id': str(job['_id']),
+        'status': job['status'],
+        'filename': job.get('filename'),
+        'attempts': job.get('attempts', 0),
+        'worker': job.get('worker'),
+        'submitted_at': job['created_at'].timestamp(),
+        'started_at': job['started_at'].timestamp() if job.get('started_at') else None,
+        'finished_at': job['finished_at'].timestamp() if job.get('finished_at') else None,
+        'result': job.get('result'),
+        'error': job.get('error'),
+    }
+
+# ---------- worker side ----------
+def claim(worker_id, lease_seconds=LEASE_SECONDS):
+    """
+    Atomically take the oldest runnable job: a queued one whose backoff has
+    passed, or a running one whose lease expired (its worker is presumed dead).
+    """
+    ensure_indexes()
+    now = _now()
+    return jobs_collection().find_one_and_update(
+        {
+            '$or': [
+                {'status': 'queued', 'available_at': {'$lte': now}},
+                {'status': 'running', 'lease_expires_at': {'$lte': now}},
+            ],
+            '$expr': {'$lt': ['$attempts', '$max_attempts']},
+        },
+        {
+            '$set': {
+                'status': 'running',
+                'worker': worker_id,
+                'started_at': now,
+                'heartbeat_at': now,
+                'lease_expires_at': now + timedelta(seconds=lease_seconds),
+            },
+            '$inc': {'attempts': 1},
+        },
+        sort=[('available_at', ASCENDING)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+def heartbeat(job_id, worker_id, lease_seconds=LEASE_SECONDS):
+    """Extend the lease; returns False if the job is no longer ours."""
+    now = _now()
+    res = jobs_collection().update_one(
+        {'_id': job_id, 'worker': worker_id, 'status': 'running'},
+        {'$set': {'heartbeat_at': now, 'lease_expires_at': now + timedelta(seconds=lease_seconds)}},
+    )
+    return res.modified_count == 1
+
+def load_upload(job):
+    return uploads_fs().get(job['file_id']).read()
+
+def complete(job, worker_id, result):
+    res = jobs_collection().update_one(
+        {'_id': job['_id'], 'worker': worker_id, 'status': 'running'},
+        {'$set': {'status': 'done', 'result': result, 'error': None, 'finished_at': _now(),
+                  'lease_expires_at': None}},
+    )
+    if res.modified_count == 1:
+        uploads_fs().delete(job['file_id'])
+    return res.modified_count == 1
+
+def fail(job, worker_id, error):
+    """Requeue with linear backoff, or dead-letter once attempts are used up."""
+    now = _now()
+    if job['attempts'] >= job['max_attempts']:
+        update = {'status': 'dead', 'finished_at': now}
+    else:
+        update = {'status': 'queued',
+                  'available_at': now + timedelta(seconds=RETRY_BACKOFF_SECONDS * job['attempts'])}
+    update.update({'error': error, 'lease_expires_at': None})
+    res = jobs_collection().update_one({'_id': job['_id'], 'worker': worker_id, 'status': 'running'},
+                              {'$set': update})
+    return res.modified_count == 1
+
+def dead_letter_expired():
+    """Dead-letter running jobs whose lease expired on their last allowed attempt."""
+    now = _now()
+    res = jobs_collection().update_many(
+        {'status': 'running', 'lease_expires_at': {'$lte': now},
+         '$expr': {'$gte': ['$attempts', '$max_attempts']}},
+        {'$set': {'status': 'dead', 'finished_at': now, 'lease_expires_at': None,
+                  'error': 'Lease expired on final attempt (worker lost)'}},
+    )
+    return res.modified_count